@@ -0,0 +1,487 @@
+# api.py
+# Headless JSON API over db.py for scripts and other internal systems.
+# Plain ASGI with no framework; every request runs in a worker thread on a
+# pooled connection. Usage: python api.py --port 8600 (needs uvicorn), or
+# serve `api:app` with any ASGI server. Requests go to the default workspace
+# unless they carry an `X-Workspace: <name>` header.
+#
+#   GET    /clients            ?limit=&offset=
+#   POST   /clients            {...}          POST /clients/bulk  [{...}, ...]  (?force=1)
+#   GET    /clients/duplicates ?name=&limit=
+#   GET    /clients/{id}       PATCH /clients/{id} {..., "version": n}
+#   DELETE /clients/{id}
+#   GET    /clients/{id}/logs  GET /clients/{id}/modules
+#   GET    /logs               ?status=&client_id=&limit=&offset=
+#   POST   /logs               {...}          POST /logs/bulk     [{...}, ...]
+#   GET    /logs/{id}          PATCH /logs/{id} {..., "version": n}
+#   DELETE /logs/{id}
+#   GET    /reports/{workload|logs-per-week|logs-per-day|completion-time|
+#                    golive|modules|integrations|workspaces|overdue|
+#                    time-in-status|cycle-time}
+# Field values must match their column type (dates as "YYYY-MM-DD",
+# flags as true/false); a 400 names the field that does not.
+# Errors come back as {"error": "..."}; 503 with Retry-After means the
+# database was busy and the request can be retried.
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import fields, is_dataclass
+from datetime import date
+from urllib.parse import parse_qs
+
+import db
+
+API_TOKEN = os.environ.get("LOGBOOK_API_TOKEN")  # optional bearer token
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BODY = 5 * 1_048_576
+RETRY_AFTER = 1  # seconds a client is asked to wait while the database is busy
+
+log = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ------- Encoding -------
+def _plain(obj):
+    if is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    if isinstance(obj, db.BACKEND.Row):
+        return dict(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def _encode(data):
+    return json.dumps(data, default=_plain, separators=(",", ":")).encode()
+
+
+def _etag(body: bytes):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# ------- Request helpers -------
+def _int(query: dict, name: str, default=None):
+    value = query.get(name, [None])[0]
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+
+
+def _page(query: dict):
+    limit = min(max(_int(query, "limit", PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    return limit, max(_int(query, "offset", 0), 0)
+
+
+# Fetch one row more than asked to tell whether another page exists
+def _paged(fetch, query: dict):
+    limit, offset = _page(query)
+    rows = fetch(limit=limit + 1, offset=offset)
+    more = len(rows) > limit
+    return {
+        "items": rows[:limit],
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if more else None,
+    }
+
+
+def _found(row, what: str):
+    if row is None:
+        raise ApiError(404, f"{what} not found")
+    return row
+
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ApiError(400, "expected a JSON object")
+    return body
+
+
+def _list(body):
+    if not isinstance(body, list) or not all(isinstance(b, dict) for b in body):
+        raise ApiError(400, "expected a JSON array of objects")
+    return body
+
+
+# JSON type each column kind accepts (null is always accepted), and how
+# the error names it. Dates come as ISO strings.
+JSON_KINDS = {
+    "text": (str, "a string"),
+    "longtext": (str, "a string"),
+    "int": (int, "an integer"),
+    "bool": (bool, "true or false"),
+    "date": (str, "an ISO date (YYYY-MM-DD)"),
+}
+
+
+# Known fields only, each checked against its column kind (models.py) and
+# converted before it reaches the database
+def _fields(data: dict, columns, what: str):
+    unknown = set(data) - set(columns)
+    if unknown:
+        raise ApiError(400, f"unknown {what} field(s): {', '.join(sorted(unknown))}")
+    out = {}
+    for name, value in data.items():
+        kind = db.KINDS[name]
+        json_type, expected = JSON_KINDS[kind]
+        ok = value is None or isinstance(value, json_type)
+        if kind == "int" and isinstance(value, bool):
+            ok = False  # bool is an int subclass, but true is not a count
+        if ok and kind == "date" and value is not None:
+            try:
+                value = date.fromisoformat(value)
+            except ValueError:
+                ok = False
+        if not ok:
+            raise ApiError(400, f"'{name}' must be {expected}")
+        out[name] = value
+    return out
+
+
+# Bulk bodies: each item checked by `check`; errors name the item
+def _items(body, check):
+    items = []
+    for i, d in enumerate(_list(body)):
+        try:
+            items.append(check(d))
+        except ApiError as e:
+            raise ApiError(e.status, f"item {i}: {e}")
+    return items
+
+
+# Partial update with optional optimistic check on "version"
+def _patch(update, row_id: int, body, columns, what: str):
+    data = dict(_object(body))
+    version = data.pop("version", None)
+    if not update(row_id, _fields(data, columns, what), version).result():
+        raise ApiError(409, f"{what} was changed or deleted; reload and retry")
+    return {"id": row_id}
+
+
+# ------- Handlers -------
+# Each handler gets (match, query, body) and returns (status, payload)
+def list_clients(m, q, body):
+    return 200, _paged(db.get_all_clients, q)
+
+
+def get_client(m, q, body):
+    return 200, _found(db.get_client_by_id(int(m["id"])), "client")
+
+
+# Creates and imports refuse a name another live client (or another item
+# of the same import) already has once normalized, unless ?force=1
+def _no_duplicates(q, items):
+    if q.get("force", ["0"])[0] == "1":
+        return
+    seen = {}
+    for i, d in enumerate(items):
+        norm = db.normalize_name(d["name"])
+        if norm in seen:
+            raise ApiError(409, f"items {seen[norm]} and {i} are the same client ('{d['name']}')")
+        seen[norm] = i
+        same = db.clients_named(d["name"])
+        if same:
+            raise ApiError(
+                409, f"'{d['name']}' already exists as client {same[0][0]} "
+                f"('{same[0][1]}'); pass ?force=1 to create it anyway",
+            )
+
+
+# Names are normalized and indexed for duplicate detection, so they must
+# be non-blank strings
+def _valid_name(name):
+    return isinstance(name, str) and bool(name.strip())
+
+
+def _client_data(data: dict):
+    data = _fields(data, db.CLIENT_COLUMNS, "client")
+    if not _valid_name(data.get("name")):
+        raise ApiError(400, "'name' is required and must be a string")
+    return data
+
+
+def create_client(m, q, body):
+    data = _client_data(_object(body))
+    _no_duplicates(q, [data])
+    return 201, {"id": db.create_client(data).result()}
+
+
+def create_clients(m, q, body):
+    items = _items(body, _client_data)
+    _no_duplicates(q, items)
+    return 201, {"ids": db.create_clients(items).result()}
+
+
+def client_duplicates(m, q, body):
+    name = q.get("name", [""])[0]
+    if not name.strip():
+        raise ApiError(400, "'name' is required")
+    return 200, {"items": db.find_duplicate_clients(name, limit=_int(q, "limit", 5))}
+
+
+def patch_client(m, q, body):
+    if isinstance(body, dict) and "name" in body and not _valid_name(body["name"]):
+        raise ApiError(400, "'name' must be a non-blank string")
+    return 200, _patch(db.update_client, int(m["id"]), body, db.CLIENT_COLUMNS, "client")
+
+
+def delete_client(m, q, body):
+    db.delete_client(int(m["id"])).result()
+    return 204, None
+
+
+def client_logs(m, q, body):
+    cid = int(m["id"])
+    _found(db.get_client_by_id(cid), "client")
+    return 200, _paged(lambda **page: db.get_all_logs(client_id=cid, **page), q)
+
+
+def client_modules(m, q, body):
+    cid = int(m["id"])
+    _found(db.get_client_by_id(cid), "client")
+    return 200, {"items": db.get_modules_for_client(cid)}
+
+
+LOG_FIELDS = ("client_id", *db.LOG_COLUMNS)
+
+
+def list_logs(m, q, body):
+    status = q.get("status", ["All"])[0]
+    cid = _int(q, "client_id")
+    return 200, _paged(lambda **page: db.get_all_logs(status, cid, **page), q)
+
+
+def get_log(m, q, body):
+    return 200, _found(db.get_log_by_id(int(m["id"])), "log")
+
+
+def _log_data(data: dict):
+    data = _fields(data, LOG_FIELDS, "log")
+    if not data.get("title") or data.get("client_id") is None:
+        raise ApiError(400, "'client_id' and 'title' are required")
+    return data
+
+
+def create_log(m, q, body):
+    return 201, {"id": db.create_log(_log_data(_object(body))).result()}
+
+
+def create_logs(m, q, body):
+    items = _items(body, _log_data)
+    return 201, {"ids": db.create_logs(items).result()}
+
+
+def patch_log(m, q, body):
+    return 200, _patch(db.update_log, int(m["id"]), body, db.LOG_COLUMNS, "log")
+
+
+def delete_log(m, q, body):
+    db.delete_log(int(m["id"])).result()
+    return 204, None
+
+
+def _flags(q: dict, name: str):
+    names = [n for v in q.get(name, []) for n in v.split(",") if n]
+    known = {col for col, _ in db.INTEGRATION_FLAGS}
+    unknown = set(names) - known
+    if unknown:
+        raise ApiError(400, f"unknown integration(s): {', '.join(sorted(unknown))}")
+    return names
+
+
+def report(m, q, body):
+    name = m["name"]
+    since = q.get("since", ["0000-00-00"])[0]
+    cid = _int(q, "client_id")
+    if name == "workload":
+        group_by = q.get("group_by", [None])[0]
+        if group_by not in (None, "client", "week"):
+            raise ApiError(400, "'group_by' must be client or week")
+        rows = db.owner_workload(group_by)
+    elif name == "logs-per-week":
+        rows = db.logs_per_week(since, cid)
+    elif name == "logs-per-day":
+        rows = db.logs_per_day(since, cid)
+    elif name == "completion-time":
+        rows = db.completion_time_per_week(since, cid)
+    elif name == "golive":
+        rows = db.golive_pipeline_by_month()
+    elif name == "modules":
+        rows = db.module_adoption()
+    elif name == "integrations":
+        rows = db.get_clients_by_integrations(_flags(q, "require"), _flags(q, "exclude"))
+    elif name == "workspaces":
+        rows = db.workspace_summary()
+    elif name == "time-in-status":
+        rows = db.time_in_status(since)
+    elif name == "cycle-time":
+        rows = db.cycle_lead_time_per_week(since)
+    elif name == "overdue":
+        rows = db.overdue_logs(cid)
+    else:
+        raise ApiError(404, f"unknown report '{name}'")
+    return 200, {"items": rows}
+
+
+ROUTES = [
+    ("GET", r"/clients", list_clients),
+    ("POST", r"/clients", create_client),
+    ("POST", r"/clients/bulk", create_clients),
+    ("GET", r"/clients/duplicates", client_duplicates),
+    ("GET", r"/clients/(?P<id>\d+)", get_client),
+    ("PATCH", r"/clients/(?P<id>\d+)", patch_client),
+    ("DELETE", r"/clients/(?P<id>\d+)", delete_client),
+    ("GET", r"/clients/(?P<id>\d+)/logs", client_logs),
+    ("GET", r"/clients/(?P<id>\d+)/modules", client_modules),
+    ("GET", r"/logs", list_logs),
+    ("POST", r"/logs", create_log),
+    ("POST", r"/logs/bulk", create_logs),
+    ("GET", r"/logs/(?P<id>\d+)", get_log),
+    ("PATCH", r"/logs/(?P<id>\d+)", patch_log),
+    ("DELETE", r"/logs/(?P<id>\d+)", delete_log),
+    ("GET", r"/reports/(?P<name>[\w-]+)", report),
+]
+ROUTES = [(method, re.compile(path + "/?"), fn) for method, path, fn in ROUTES]
+
+
+def _route(method: str, path: str):
+    allowed = False
+    for verb, pattern, fn in ROUTES:
+        m = pattern.fullmatch(path)
+        if m:
+            if verb == method or (method == "HEAD" and verb == "GET"):
+                return fn, m
+            allowed = True
+    raise ApiError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+
+def _workspace(headers: dict):
+    name = headers.get(b"x-workspace", b"").decode() or db.DEFAULT_WORKSPACE
+    if name not in db.list_workspaces():
+        raise ApiError(404, f"unknown workspace '{name}'")
+    return name
+
+
+# Runs in a worker thread, on a connection borrowed from the workspace's pool
+def _handle(workspace, fn, m, query, body):
+    with db.use_workspace(workspace), db.pooled():
+        try:
+            return fn(m, query, body)
+        except (db.BACKEND.IntegrityError, KeyError) as e:
+            raise ApiError(400, f"invalid data: {e}")
+
+
+# ------- ASGI -------
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise ApiError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send(send, status: int, body: bytes = b"", headers=()):
+    headers = [(b"content-length", str(len(body)).encode()), *headers]
+    if body:
+        headers.append((b"content-type", b"application/json"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _init_workspaces():
+    for name in db.list_workspaces():
+        with db.use_workspace(name):
+            db.init_db()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.to_thread(_init_workspaces)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    headers = dict(scope["headers"])
+    try:
+        if API_TOKEN and headers.get(b"authorization") != f"Bearer {API_TOKEN}".encode():
+            raise ApiError(401, "missing or wrong bearer token")
+        fn, m = _route(method, scope["path"])
+        workspace = _workspace(headers)
+        raw = await _read_body(receive)
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            raise ApiError(400, "body is not valid JSON")
+        query = parse_qs(scope.get("query_string", b"").decode())
+        status, payload = await asyncio.to_thread(_handle, workspace, fn, m, query, body)
+    except ApiError as e:
+        return await _send(send, e.status, _encode({"error": str(e)}))
+    except Exception as e:
+        # Anything else still gets a JSON body: 503 for lock contention,
+        # which a retry can get past, 500 for the rest
+        if db.BACKEND.is_busy(e):
+            return await _send(
+                send, 503, _encode({"error": "database is busy; retry shortly"}),
+                [(b"retry-after", str(RETRY_AFTER).encode())],
+            )
+        log.exception("%s %s failed", method, scope["path"])
+        return await _send(send, 500, _encode({"error": f"internal error ({type(e).__name__})"}))
+
+    if payload is None:
+        return await _send(send, status)
+    out = _encode(payload)
+    if method not in ("GET", "HEAD"):
+        return await _send(send, status, out)
+
+    etag = _etag(out)
+    cache = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+    if etag.encode() in [t.strip() for t in headers.get(b"if-none-match", b"").split(b",")]:
+        return await _send(send, 304, headers=cache)
+    await _send(send, status, b"" if method == "HEAD" else out, cache)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the JSON API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8600)
+    ap.add_argument("--db", default=db.DB_PATH, help="database file")
+    args = ap.parse_args()
+    db.DB_PATH = args.db
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("api.py needs an ASGI server to run: pip install uvicorn")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,69 @@
 # app.py
 import streamlit as st
 import pandas as pd
+import os
+from datetime import date, datetime, timedelta
 
 from db import (
     init_db,
     get_all_clients,
     get_all_logs,
     get_log_by_id,
+    overdue_logs,
+    CLIENT_LIST,
+    CLIENT_NAMES,
+    LOG_LIST,
+    LOG_SUMMARY,
+    find_logs,
+    owner_workload,
+    logs_per_week,
+    logs_per_day,
+    completion_time_per_week,
+    time_in_status,
+    cycle_lead_time_per_week,
+    golive_pipeline_by_month,
+    client_milestones,
+    logs_per_month,
+    INTEGRATION_FLAGS,
+    integration_mask_counts,
+    get_clients_by_integrations,
+    module_adoption,
+    get_clients_with_module,
+    STATS,
+    SLA_DAYS,
+    UNDO_WINDOW_DAYS,
+    get_deleted,
+    restore_client,
+    restore_log,
+    BACKEND,
+    DEFAULT_WORKSPACE,
+    create_workspace,
+    current_path,
+    list_workspaces,
+    set_workspace,
+    workspace_summary,
+    owner_workload_across_workspaces,
+)
+from backup import BACKUP_DIR, BACKUP_KEEP, create_backup, list_backups, restore_backup
+from maintenance import (
+    MAINT_FREE_PAGES, compact, last_runs, page_slack, run_now, start_maintenance, storage_stats,
+)
+from views import (
+    THEME_LINK,
+    cached_window,
+    page_header,
+    section_title,
+    sla_badge,
+    sla_table,
+    start_payload_meter,
+    stop_payload_meter,
+    sync_revisions,
+    to_df,
+    track_write,
+    write_status,
+    queued_rows,
+    queued_deletes,
 )
-from views import to_df
 from dialogs import (
     quick_add_log_dialog,
     quick_add_log_for_client_dialog,
@@ -23,61 +78,50 @@ from dialogs import (
 
 def dashboard_page():
     # Notion-like page header
-    st.markdown(
-        """
-        <div class="notion-page-header">
-            <div class="notion-page-icon">📊</div>
-            <div>
-                <div class="notion-page-title">Dashboard</div>
-                <div class="notion-page-subtitle">
-                    High-level view of all your clients and work logs.
-                </div>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    page_header("📊", "Dashboard", "High-level view of all your clients and work logs.")
 
     top_row = st.columns([3, 1])
     with top_row[1]:
         if st.button("➕ Quick Add Log", use_container_width=True):
             quick_add_log_dialog()
 
-    clients = get_all_clients()
-    logs = get_all_logs()
+    clients = get_all_clients(columns=CLIENT_NAMES)
+    logs = get_all_logs(columns=LOG_SUMMARY)
 
     total_clients = len(clients)
     total_logs = len(logs)
     open_logs = [
         l for l in logs
-        if (l["status"] or "").lower() not in ("completed", "done", "closed")
+        if (l.status or "").lower() not in ("completed", "done", "closed")
     ]
     open_count = len(open_logs)
 
-    st.markdown(
-        '<div class="notion-section-title">Key Metrics</div>',
-        unsafe_allow_html=True,
-    )
+    overdue = overdue_logs()
+
+    section_title("Key Metrics")
     m1, m2, m3 = st.columns(3)
     m1.metric("Total Clients", total_clients)
     m2.metric("Total Logs", total_logs)
     m3.metric("Open Logs", open_count)
+    if overdue:
+        sla_badge(len(overdue))
+        with st.expander("Logs past SLA", expanded=False):
+            sla_table(overdue)
+            limits = ", ".join(f"{s} {d} days" for s, d in SLA_DAYS.items())
+            st.caption(f"Limits: {limits}. Refreshed by the background SLA scan.")
 
     st.markdown(
         '<div class="notion-section-divider"></div>',
         unsafe_allow_html=True,
     )
 
-    st.markdown(
-        '<div class="notion-section-title">Task Overview</div>',
-        unsafe_allow_html=True,
-    )
+    section_title("Task Overview")
     if not logs:
         st.info("No logs yet.")
     else:
-        lookup = {c["id"]: c["name"] for c in clients}
+        lookup = {c.id: c.name for c in clients}
         for l in logs[:5]:
-            client_name = lookup.get(l["client_id"], "Client")
+            client_name = lookup.get(l.client_id, "Client")
 
             col1, col2 = st.columns([3, 1])
             with col1:
@@ -85,9 +129,9 @@ def dashboard_page():
                     f"""
                     <div class="notion-log-row">
                         <div class="notion-log-info">
-                            <div class="notion-log-title">{l['title']}</div>
+                            <div class="notion-log-title">{l.title}</div>
                             <div class="notion-log-meta">
-                                {client_name} | {l['log_date'] or ''} | {l['status'] or ''}
+                                {client_name} | {l.log_date or ''} | {l.status or ''}
                             </div>
                         </div>
                     </div>
@@ -97,29 +141,16 @@ def dashboard_page():
 
             with col2:
                 st.write("")  # small top padding
-                if st.button("Edit", key=f"dash_edit_{l['id']}"):
-                    show_edit_log_dialog(l["id"], get_log_by_id)
+                if st.button("Edit", key=f"dash_edit_{l.id}"):
+                    show_edit_log_dialog(l.id, get_log_by_id)
 
         st.caption("Showing latest 5 logs.")
 
 
 def clients_page():
-    st.markdown(
-        """
-        <div class="notion-page-header">
-            <div class="notion-page-icon">👥</div>
-            <div>
-                <div class="notion-page-title">Clients</div>
-                <div class="notion-page-subtitle">
-                    Database of all implementation clients with quick actions.
-                </div>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    page_header("👥", "Clients", "Database of all implementation clients with quick actions.")
 
-    clients = get_all_clients()
+    clients = get_all_clients(columns=CLIENT_LIST)
 
     # Top bar: search + filter + add new
     bar1, bar2, bar3 = st.columns([3, 1.3, 1.2])
@@ -141,19 +172,20 @@ def clients_page():
             add_client_dialog()
 
     def match(c):
-        if status_filter != "All" and (c["status"] or "") != status_filter:
+        if status_filter != "All" and (c.status or "") != status_filter:
             return False
         if search:
             s = search.lower()
             return (
-                s in (c["name"] or "").lower()
-                or s in (c["code"] or "").lower()
-                or s in (c["status"] or "").lower()
-                or s in (c["state"] or "").lower()
+                s in (c.name or "").lower()
+                or s in (c.code or "").lower()
+                or s in (c.status or "").lower()
+                or s in (c.state or "").lower()
             )
         return True
 
-    filtered = [c for c in clients if match(c)]
+    deleting = queued_deletes("client")
+    filtered = [c for c in clients if c.id not in deleting and match(c)]
 
     st.markdown(
         """
@@ -167,6 +199,18 @@ def clients_page():
         unsafe_allow_html=True,
     )
 
+    # Queued creates are shown until the writer commits them (async writes)
+    for row in queued_rows("client"):
+        st.markdown('<div class="notion-table-row">', unsafe_allow_html=True)
+        col_id, col_name, col_status, col_actions = st.columns([1, 3, 2, 3])
+        col_id.markdown("<div class='nt-cell-id'>⏳</div>", unsafe_allow_html=True)
+        col_name.markdown(
+            f"<div class='nt-cell-name'><div class='nt-name-main'>{row['name']}</div></div>",
+            unsafe_allow_html=True,
+        )
+        col_status.markdown("<div class='nt-pill nt-pill-status'>Saving…</div>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+
     if not filtered:
         st.markdown(
             '<div class="notion-empty">'
@@ -182,18 +226,18 @@ def clients_page():
 
         with col_id:
             st.markdown(
-                f"<div class='nt-cell-id'>{c['id']:03d}</div>",
+                f"<div class='nt-cell-id'>{c.id:03d}</div>",
                 unsafe_allow_html=True,
             )
 
         with col_name:
             sub = " · ".join(
-                x for x in [c["code"] or "", c["state"] or ""] if x
+                x for x in [c.code or "", c.state or ""] if x
             )
             st.markdown(
                 f"""
                 <div class="nt-cell-name">
-                    <div class="nt-name-main">{c['name']}</div>
+                    <div class="nt-name-main">{c.name}</div>
                     <div class="nt-name-sub">{sub}</div>
                 </div>
                 """,
@@ -201,7 +245,7 @@ def clients_page():
             )
 
         with col_status:
-            status = c["status"] or "—"
+            status = c.status or "—"
             st.markdown(
                 f"<div class='nt-pill nt-pill-status'>{status}</div>",
                 unsafe_allow_html=True,
@@ -210,43 +254,30 @@ def clients_page():
         with col_actions:
             b1, b2, b3 = st.columns(3)
             with b1:
-                if st.button("Open", key=f"open_{c['id']}"):
-                    show_client_detail_dialog(c["id"])
+                if st.button("Open", key=f"open_{c.id}"):
+                    show_client_detail_dialog(c.id)
             with b2:
-                if st.button("Edit", key=f"edit_{c['id']}"):
-                    show_edit_client_dialog(c["id"])
+                if st.button("Edit", key=f"edit_{c.id}"):
+                    show_edit_client_dialog(c.id)
             with b3:
-                if st.button("Log", key=f"log_{c['id']}"):
-                    quick_add_log_for_client_dialog(c["id"])
+                if st.button("Log", key=f"log_{c.id}"):
+                    quick_add_log_for_client_dialog(c.id)
 
         st.markdown("</div>", unsafe_allow_html=True)
 
 
 def logs_page():
-    st.markdown(
-        """
-        <div class="notion-page-header">
-            <div class="notion-page-icon">📝</div>
-            <div>
-                <div class="notion-page-title">Logs & Tasks</div>
-                <div class="notion-page-subtitle">
-                    Timeline of all activities across every client.
-                </div>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    page_header("📝", "Logs & Tasks", "Timeline of all activities across every client.")
 
     if st.button("➕ Quick Add Log", use_container_width=True):
         quick_add_log_dialog()
 
-    clients = get_all_clients()
-    lookup = {c["id"]: c["name"] for c in clients}
+    clients = get_all_clients(columns=CLIENT_NAMES)
+    lookup = {c.id: c.name for c in clients}
 
     f1, f2 = st.columns(2)
     with f1:
-        options = ["All Clients"] + [f"{c['name']} (#{c['id']})" for c in clients]
+        options = ["All Clients"] + [f"{c.name} (#{c.id})" for c in clients]
         choice = st.selectbox("Filter by client", options)
         client_id = (
             None if choice == "All Clients"
@@ -257,7 +288,24 @@ def logs_page():
             "Status", ["All", "Not Started", "In Progress", "Blocked", "Completed"]
         )
 
-    logs = get_all_logs(status_filter=status_filter, client_id=client_id)
+    logs = get_all_logs(status_filter=status_filter, client_id=client_id, columns=LOG_LIST)
+    deleting = queued_deletes("log")
+    logs = [l for l in logs if l.id not in deleting]
+
+    # Queued creates are listed apart until committed: they have no id to select yet
+    saving = [
+        r for r in queued_rows("log")
+        if client_id in (None, r["client_id"]) and status_filter in ("All", r["status"])
+    ]
+    if saving:
+        st.caption("⏳ Saving")
+        df = pd.DataFrame(saving)
+        df["Client"] = df["client_id"].map(lookup)
+        st.dataframe(
+            df[["Client", "log_date", "title", "status", "owner", "remarks"]],
+            use_container_width=True, hide_index=True,
+        )
+
     if not logs:
         st.info("No logs for the selected filters.")
         return
@@ -267,300 +315,578 @@ def logs_page():
     cols = ["id", "Client", "log_date", "title", "status", "owner", "remarks"]
     cols = [c for c in cols if c in df.columns]
 
+    section_title("Logs Table")
+    st.caption("Select a row to edit or delete that log.")
+    event = st.dataframe(
+        df[cols],
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="logs_table",
+    )
+    # Open the dialog once per new selection; the selection itself persists
+    picked = event.selection.rows
+    selected = int(df["id"].iloc[picked[0]]) if picked else None
+    if selected is not None and selected != st.session_state.get("logs_table_opened"):
+        st.session_state["logs_table_opened"] = selected
+        show_edit_log_dialog(selected, get_log_by_id)
+    elif selected is None:
+        st.session_state.pop("logs_table_opened", None)
+
     st.markdown(
-        '<div class="notion-section-title">Logs Table</div>',
+        '<div class="notion-section-divider"></div>',
         unsafe_allow_html=True,
     )
+    section_title("Find a Log")
+
+    term = st.text_input(
+        "Find log", placeholder="#id or the start of a title", label_visibility="collapsed"
+    )
+    matches = find_logs(term, columns=LOG_SUMMARY)
+    if term and not matches:
+        st.caption("No log matches that id or title.")
+    if matches:
+        found = st.selectbox(
+            "Matching logs",
+            matches,
+            format_func=lambda l: f"{l.id} - {l.title} ({lookup.get(l.client_id, 'Client')})",
+        )
+        if st.button("Edit Log"):
+            show_edit_log_dialog(found.id, get_log_by_id)
+
+
+def workload_page():
+    page_header("🏋️", "Workload", "Open, blocked and completed logs per owner.")
+
+    breakdown = st.radio(
+        "Breakdown",
+        ["Per Owner", "Per Owner & Client", "Per Owner & Week"],
+        horizontal=True,
+        label_visibility="collapsed",
+    )
+    group_by = {
+        "Per Owner": None,
+        "Per Owner & Client": "client",
+        "Per Owner & Week": "week",
+    }[breakdown]
+
+    rows = owner_workload(group_by)
+    if not rows:
+        st.info("No logs yet.")
+        return
+
+    df = to_df(rows)
+    totals = df[["open_count", "blocked_count", "completed_count"]].sum()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Open", int(totals["open_count"]))
+    m2.metric("Blocked", int(totals["blocked_count"]))
+    m3.metric("Completed", int(totals["completed_count"]))
+
+    section_title("By Owner")
+    if group_by is None:
+        st.bar_chart(
+            df.set_index("owner")[["open_count", "blocked_count"]],
+            use_container_width=True,
+        )
+
+    cols = ["owner", "client_name", "week",
+            "open_count", "blocked_count", "completed_count", "total_count"]
+    cols = [c for c in cols if c in df.columns]
     st.dataframe(df[cols], use_container_width=True, hide_index=True)
 
+
+def analytics_page():
+    page_header("📈", "Analytics", "Activity trends served from pre-bucketed rollups.")
+
+    window = st.radio(
+        "Window",
+        ["12 weeks", "6 months", "1 year", "All time"],
+        index=2,
+        horizontal=True,
+        label_visibility="collapsed",
+    )
+    days = {"12 weeks": 84, "6 months": 183, "1 year": 365, "All time": None}[window]
+    since = (date.today() - timedelta(days=days)).isoformat() if days else ""
+
+    section_title("Logs per Week")
+    weekly = to_df(logs_per_week(since))
+    if weekly.empty:
+        st.info("No logs in this window.")
+    else:
+        weekly["status"] = weekly["status"].replace("", "No Status")
+        st.bar_chart(
+            weekly.pivot_table(index="week", columns="status", values="logs", fill_value=0),
+            use_container_width=True,
+        )
+
+    section_title("Daily Activity")
+    daily = to_df(logs_per_day(since))
+    if not daily.empty:
+        st.line_chart(daily.set_index("day")["logs"], use_container_width=True)
+
+    section_title("Average Days to Completion")
+    cycle = to_df(completion_time_per_week(since))
+    if cycle.empty:
+        st.info("No logs completed in this window.")
+    else:
+        st.line_chart(cycle.set_index("week")["avg_days"], use_container_width=True)
+        st.caption(
+            "Days from the first move to In Progress until the log was first marked "
+            "Completed, by week of completion."
+        )
+
+    section_title("Time in Status")
+    stays = to_df(time_in_status(since))
+    if stays.empty:
+        st.info("No status changes in this window.")
+    else:
+        stays["status"] = stays["status"].replace("", "No Status")
+        st.bar_chart(stays.set_index("status")["avg_days"], use_container_width=True)
+        st.caption("Average days a log stayed in each status before moving on, from the status history.")
+
+    section_title("Cycle & Lead Time")
+    times = to_df(cycle_lead_time_per_week(since))
+    if times.empty:
+        st.info("No logs completed in this window.")
+    else:
+        st.line_chart(times.set_index("week")[["lead_days", "cycle_days"]], use_container_width=True)
+        st.caption(
+            "Lead time: log date to first completion. Cycle time: first move to "
+            "In Progress to first completion. By week of completion."
+        )
+
+    st.markdown(
+        '<div class="notion-section-divider"></div>',
+        unsafe_allow_html=True,
+    )
+    section_title("Go-Live Pipeline by Month")
+    pipeline = to_df(golive_pipeline_by_month())
+    if pipeline.empty:
+        st.info("No go-live dates recorded.")
+    else:
+        pipeline["status"] = pipeline["status"].replace("", "No Status")
+        st.bar_chart(
+            pipeline.pivot_table(index="month", columns="status", values="clients", fill_value=0),
+            use_container_width=True,
+        )
+
+
+def _month_start(d: date, months: int = 0):
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def calendar_page():
+    page_header("🗓️", "Calendar", "Trainings and go-lives by month, with log activity.")
+
+    if "calendar_month" not in st.session_state:
+        st.session_state["calendar_month"] = _month_start(date.today())
+    c1, c2, c3, c4 = st.columns([1, 1, 1, 3])
+    if c1.button("◀ Earlier", use_container_width=True):
+        st.session_state["calendar_month"] = _month_start(st.session_state["calendar_month"], -1)
+    if c2.button("This Month", use_container_width=True):
+        st.session_state["calendar_month"] = _month_start(date.today())
+    if c3.button("Later ▶", use_container_width=True):
+        st.session_state["calendar_month"] = _month_start(st.session_state["calendar_month"], 1)
+    span = c4.radio(
+        "Span", [1, 3, 6], index=1, horizontal=True,
+        format_func=lambda n: f"{n} month{'s' if n > 1 else ''}",
+        label_visibility="collapsed",
+    )
+
+    first = st.session_state["calendar_month"]
+    start, end = first.isoformat(), _month_start(first, span).isoformat()
+    rows = cached_window("milestones", ("clients",), start, end, client_milestones)
+
+    m1, m2 = st.columns(2)
+    m1.metric("Trainings", sum(r["kind"] == "Training" for r in rows))
+    m2.metric("Go-Lives", sum(r["kind"] == "Go-Live" for r in rows))
+
+    df = to_df(rows)
+    for i in range(span):
+        month = _month_start(first, i)
+        section_title(f"{month:%B %Y}")
+        shown = df[df["day"].str.startswith(f"{month:%Y-%m}")] if not df.empty else df
+        if shown.empty:
+            st.caption("No trainings or go-lives this month.")
+            continue
+        st.dataframe(
+            shown[["day", "kind", "name", "status"]].rename(columns={
+                "day": "Date", "kind": "Milestone", "name": "Client", "status": "Status",
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
+
     st.markdown(
         '<div class="notion-section-divider"></div>',
         unsafe_allow_html=True,
     )
+    # The twelve months ending with the last one shown above
+    section_title("Log Activity by Month")
+    since = _month_start(first, span - 12).isoformat()
+    activity = to_df(cached_window("log_activity", ("client_logs",), since, end, logs_per_month))
+    if activity.empty:
+        st.info("No logs in these months.")
+    else:
+        activity["status"] = activity["status"].replace("", "No Status")
+        st.bar_chart(
+            activity.pivot_table(index="month", columns="status", values="logs", fill_value=0),
+            use_container_width=True,
+        )
+
+
+def integrations_page():
+    page_header("🔌", "Integrations", "Integration adoption across the whole client portfolio.")
+
+    labels = dict(INTEGRATION_FLAGS)
+    client_statuses = ["Not Started", "In Progress", "On Hold",
+                       "Completed", "Churned", "Other"]
+    statuses = st.multiselect("Client status", client_statuses)
+
+    # One row per distinct mask (at most 256), decoded here
+    counts = integration_mask_counts(statuses)
+    total = sum(r["clients"] for r in counts)
+    if not total:
+        st.info("No clients match this status filter.")
+        return
+
+    adoption = []
+    matrix = pd.DataFrame(0, index=list(labels.values()), columns=list(labels.values()))
+    for r in counts:
+        on = [label for bit, (_, label) in enumerate(INTEGRATION_FLAGS)
+              if r["integration_mask"] & (1 << bit)]
+        for a in on:
+            for b in on:
+                matrix.loc[a, b] += r["clients"]
+    for label in labels.values():
+        adoption.append({"Integration": label, "Clients": int(matrix.loc[label, label])})
+
+    section_title("Adoption")
+    st.caption(f"{total} clients")
+    st.bar_chart(
+        pd.DataFrame(adoption).set_index("Integration"),
+        horizontal=True,
+        use_container_width=True,
+    )
+
+    section_title("Co-Adoption Matrix")
+    st.dataframe(matrix, use_container_width=True)
+
     st.markdown(
-        '<div class="notion-section-title">Edit / Delete Log</div>',
+        '<div class="notion-section-divider"></div>',
         unsafe_allow_html=True,
     )
+    section_title("Find Clients")
+    f1, f2 = st.columns(2)
+    with f1:
+        has = st.multiselect(
+            "Has all of", list(labels), format_func=labels.get
+        )
+    with f2:
+        lacks = st.multiselect(
+            "Lacks all of",
+            [c for c in labels if c not in has],
+            format_func=labels.get,
+        )
 
-    log_map = {
-        f"{l['id']} - {l['title']} ({lookup.get(l['client_id'], 'Client')})": l["id"]
-        for l in logs
-    }
-    label = st.selectbox("Select log to edit", list(log_map.keys()))
-    selected_log_id = log_map[label]
+    if not has and not lacks:
+        st.caption("Pick integrations to list matching clients.")
+        return
 
-    if st.button("Edit Selected Log"):
-        show_edit_log_dialog(selected_log_id, get_log_by_id)
+    rows = get_clients_by_integrations(has, lacks, statuses)
+    st.caption(f"{len(rows)} matching clients")
+    if rows:
+        df = to_df(rows)
+        st.dataframe(
+            df[["id", "name", "code", "state", "status"]],
+            use_container_width=True,
+            hide_index=True,
+        )
 
 
-def settings_page():
+def modules_page():
+    page_header("🧩", "Modules", "Module adoption across all clients.")
+
+    adoption = module_adoption()
+    if not adoption:
+        st.info("No modules recorded yet.")
+        return
+
+    df = to_df(adoption)
+    st.dataframe(
+        df.rename(columns={"name": "Module", "clients": "Clients", "live_clients": "LIVE"})[
+            ["Module", "Clients", "LIVE"]
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
     st.markdown(
-        """
-        <div class="notion-page-header">
-            <div class="notion-page-icon">⚙️</div>
-            <div>
-                <div class="notion-page-title">Settings & Info</div>
-                <div class="notion-page-subtitle">
-                    Lightweight configuration and help for this internal tool.
-                </div>
-            </div>
-        </div>
-        """,
+        '<div class="notion-section-divider"></div>',
         unsafe_allow_html=True,
     )
+    section_title("Clients Using a Module")
+    names = {m["id"]: m["name"] for m in adoption}
+    f1, f2 = st.columns([3, 1])
+    with f1:
+        module_id = st.selectbox("Module", list(names), format_func=names.get)
+    with f2:
+        st.write("")
+        live_only = st.checkbox("LIVE only")
+
+    rows = get_clients_with_module(module_id, live_only)
+    st.caption(f"{len(rows)} clients")
+    if rows:
+        dfc = to_df(rows)
+        dfc["is_live"] = dfc["is_live"].map(lambda x: "Yes" if x else "No")
+        st.dataframe(
+            dfc[["id", "name", "code", "state", "status", "is_live"]],
+            use_container_width=True,
+            hide_index=True,
+        )
 
+
+def settings_page():
+    page_header("⚙️", "Settings & Info", "Lightweight configuration and help for this internal tool.")
+
+    if BACKEND.name == "sqlite":
+        path = current_path()
+        storage_notes = f"""
+            <li>This workspace's data is stored in <code>{path}</code> (SQLite)</li>
+            <li>Use <strong>Backups</strong> below for safe snapshots while the app is running</li>
+            <li>
+              If you used an older schema and see errors,
+              delete <code>{path}</code> once and restart.
+            </li>"""
+    else:
+        storage_notes = f"""
+            <li>Data is stored on the {BACKEND.name} server set in <code>LOGBOOK_DATABASE_URL</code></li>
+            <li>Backups and vacuuming are left to the server's own tools</li>"""
     st.markdown(
-        """
+        f"""
         <div class="notion-text-block">
           <p>This is your local <strong>Client & Project Tracker</strong> app.</p>
-          <ul>
-            <li>Data is stored in <code>client_tracker.db</code> (SQLite)</li>
-            <li>You can back up that file to keep history safe</li>
-            <li>
-              If you used an older schema and see errors,
-              delete <code>client_tracker.db</code> once and restart.
-            </li>
+          <ul>{storage_notes}
           </ul>
         </div>
         """,
         unsafe_allow_html=True,
     )
 
+    section_title("Workspaces")
+    st.caption(
+        "Each team works in its own database file, so saves in one workspace never "
+        "wait on another. The totals below read every workspace, read-only."
+    )
+    summary = workspace_summary()
+    st.dataframe(to_df(summary), use_container_width=True, hide_index=True)
+    with st.expander("Owners across all workspaces"):
+        st.dataframe(to_df(owner_workload_across_workspaces()), use_container_width=True, hide_index=True)
+    with st.form("new_workspace", clear_on_submit=True):
+        name = st.text_input("New workspace name", help="Letters, digits, '-' and '_'.")
+        if st.form_submit_button("Create Workspace") and name.strip():
+            try:
+                create_workspace(name)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Created workspace “{name.strip()}”. Pick it in the sidebar.")
+
+    section_title("Write Statistics")
+    w1, w2, w3 = st.columns(3)
+    w1.metric("Rows Updated", STATS["rows_updated"])
+    w2.metric("Columns Written", STATS["columns_written"])
+    w3.metric("Skipped (No Changes)", STATS["writes_skipped"])
+    st.caption("Counted since the app process started.")
+
+    section_title("Render Payload")
+    sent = st.session_state.get("payload_bytes", {})
+    if sent:
+        st.dataframe(
+            pd.DataFrame(
+                [{"Page": p, "KB per rerun": round(n / 1024, 1)} for p, n in sent.items()]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption("Bytes sent to the browser on the last rerun of each page in this session.")
+    else:
+        st.caption("Open a few pages to see how much each rerun sends to the browser.")
+
+    section_title("Recently Deleted")
+    st.caption(
+        f"Deleted clients and logs can be restored for {UNDO_WINDOW_DAYS} days; "
+        "after that they are removed for good in the background."
+    )
+    deleted = get_deleted()
+    if not deleted:
+        st.info("Nothing deleted recently.")
+    for row in deleted:
+        d1, d2 = st.columns([5, 1])
+        where = f" ({row['client_name']})" if row["client_name"] else ""
+        d1.markdown(f"**{row['kind'].title()}** – {row['label']}{where} · deleted {row['deleted_at']} UTC")
+        if d2.button("Restore", key=f"restore_{row['kind']}_{row['id']}"):
+            (restore_client if row["kind"] == "client" else restore_log)(row["id"])
+            st.rerun()
+
+    # Storage stats, maintenance and snapshots are SQLite file tools
+    if BACKEND.name != "sqlite":
+        return
+
+    section_title("Storage & Maintenance")
+    stats = storage_stats()
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("File Size", f"{(stats['file_bytes'] + stats['wal_bytes']) / 1_048_576:.1f} MiB")
+    s2.metric("Free Pages", f"{stats['freelist_pages']:,}", f"{stats['free_pct']:.1f}% of file",
+              delta_color="off")
+    # Measuring slack reads every page, so only on request; kept per file
+    slack_key = f"page_slack_{current_path()}"
+    if slack_key in st.session_state:
+        slack = st.session_state[slack_key]
+        s3.metric("Page Slack", "–" if slack is None else f"{slack:.1f}%")
+    elif s3.button("Measure Page Slack"):
+        st.session_state[slack_key] = page_slack()
+        st.rerun()
+    s4.metric("Auto-vacuum", stats["auto_vacuum"].title())
+    st.caption(
+        f"{stats['page_count']:,} pages of {stats['page_size']:,} bytes. Free pages are "
+        f"released once {MAINT_FREE_PAGES} pile up; page slack is unused space inside "
+        "pages that are still in use."
+    )
+    runs = last_runs()
+    if runs:
+        st.caption("Last runs: " + ", ".join(
+            f"{name.replace('_', ' ')} {at:%Y-%m-%d %H:%M}" for name, at in sorted(runs.items())
+        ))
+    if st.button("Run Maintenance Now"):
+        with st.spinner("Running maintenance…"):
+            ran = run_now()
+        st.success(
+            "Ran " + ", ".join(f"{name.replace('_', ' ')} ({ms:.0f} ms)" for name, ms in ran) + "."
+            if ran else "Nothing to do."
+        )
+    st.caption(
+        "Compacting rewrites the whole file: it gives back free pages and page slack, and "
+        "switches older files to incremental auto-vacuum. Saving waits until it is done, "
+        "so run it when the team is not editing."
+    )
+    if st.button("Compact Database"):
+        try:
+            with st.spinner("Compacting…"):
+                ms = compact()
+        except Exception as e:
+            if not BACKEND.is_busy(e):
+                raise
+            st.error("The database is busy – try again when nobody is saving.")
+        else:
+            # Rerun so the stats above show the compacted file
+            st.session_state.pop(slack_key, None)
+            st.toast(f"Compacted in {ms:.0f} ms.")
+            st.rerun()
+
+    section_title("Backups")
+    st.caption(
+        f"Online snapshots in `{BACKUP_DIR}/`; the newest {BACKUP_KEEP} are kept. "
+        "The app keeps working while a snapshot is taken."
+    )
+    if st.button("Create Snapshot"):
+        bar = st.progress(0.0)
+        try:
+            result = create_backup(lambda done, total: bar.progress(done / total if total else 1.0))
+        except TimeoutError as e:
+            st.error(f"Snapshot abandoned: {e}.")
+        else:
+            st.success(
+                f"Saved {os.path.basename(result.path)} – {result.bytes / 1024:.0f} KiB "
+                f"in {result.seconds * 1000:.0f} ms ({result.mb_per_s:.1f} MiB/s)."
+            )
+
+    snapshots = list_backups()
+    if not snapshots:
+        st.info("No snapshots yet.")
+        return
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "Snapshot": os.path.basename(p),
+                    "Size (KiB)": round(os.path.getsize(p) / 1024),
+                    "Taken": datetime.fromtimestamp(os.path.getmtime(p)).strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                for p in snapshots
+            ]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+    r1, r2 = st.columns([3, 1])
+    chosen = r1.selectbox(
+        "Restore snapshot", snapshots, format_func=os.path.basename
+    )
+    confirm = r1.checkbox("Replace the current data with this snapshot")
+    if r2.button("Restore", disabled=not confirm):
+        bar = st.progress(0.0)
+        restored, safety = restore_backup(
+            chosen, lambda done, total: bar.progress(done / total if total else 1.0)
+        )
+        init_schema.clear()
+        st.success(
+            f"Restored {os.path.basename(chosen)} in {restored.seconds * 1000:.0f} ms. "
+            f"The previous state was saved as {os.path.basename(safety.path)}."
+        )
+
 
 # ---------- MAIN ----------
 
+# Schema setup and migrations run once per process and database file, not
+# on every rerun. A restored snapshot may predate them, so a restore
+# clears this cache.
+@st.cache_resource(show_spinner=False)
+def init_schema(path: str):
+    init_db()
+    return path
+
+
 def main():
+    start_payload_meter()
     st.set_page_config(
         page_title=" D'LogBook",
         page_icon="📚",
         layout="wide",
     )
 
-    # Global Notion-like theming + layout tweaks, dark-mode aware
-    st.markdown(
-        """
-        <style>
-        /* Hide Streamlit header bar */
-        header, [data-testid="stHeader"] {
-            display: none !important;
-        }
-
-        /* App & layout (use theme vars) */
-        .stApp {
-            background-color: var(--background-color);
-            color: var(--text-color);
-            font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-        }
-        .block-container {
-            padding-top: 3rem;
-            padding-bottom: 2.5rem;
-            max-width: 1100px;
-        }
-
-        /* Sidebar look */
-        section[data-testid="stSidebar"] {
-            background-color: var(--secondary-background-color);
-        }
-        section[data-testid="stSidebar"] [data-testid="stMarkdownContainer"] p {
-            margin-bottom: 0.4rem;
-            color: var(--text-color);
-        }
-
-        /* Sidebar radio -> Notion-like nav */
-        section[data-testid="stSidebar"] input[type="radio"] {
-            display: none !important;
-        }
-        section[data-testid="stSidebar"] [role="radiogroup"] > label {
-            padding: 6px 10px !important;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.92rem;
-            color: var(--text-color);
-            margin-bottom: 2px;
-        }
-        section[data-testid="stSidebar"] [role="radiogroup"] > label:hover {
-            background-color: rgba(148, 163, 184, 0.25) !important;
-        }
-        section[data-testid="stSidebar"] [role="radiogroup"] > label[data-selected="true"] {
-            background-color: var(--background-color) !important;
-            font-weight: 600;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.24);
-        }
-
-        /* Page header */
-        .notion-page-header {
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            margin-bottom: 1rem;
-        }
-        .notion-page-icon {
-            width: 40px;
-            height: 40px;
-            border-radius: 12px;
-            background: var(--secondary-background-color);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5rem;
-            box-shadow: 0 1px 3px rgba(15,23,42,0.3);
-        }
-        .notion-page-title {
-            font-size: 1.9rem;
-            font-weight: 700;
-            letter-spacing: -0.02em;
-            color: var(--text-color);
-        }
-        .notion-page-subtitle {
-            font-size: 0.9rem;
-            color: rgba(148, 163, 184, 0.9);
-            margin-top: 2px;
-        }
-
-        /* Sections */
-        .notion-section-title {
-            font-size: 1.05rem;
-            font-weight: 600;
-            margin: 1.0rem 0 0.4rem 0;
-            color: var(--text-color);
-        }
-        .notion-section-divider {
-            border-bottom: 1px solid rgba(148, 163, 184, 0.4);
-            margin: 1.0rem 0;
-        }
-
-        /* Clients table (Notion-style database) */
-        .notion-table-header {
-            display: grid;
-            grid-template-columns: 0.7fr 3fr 2fr 3fr;
-            font-size: 0.75rem;
-            text-transform: uppercase;
-            color: rgba(148, 163, 184, 0.95);
-            padding: 0.25rem 0.25rem;
-            border-bottom: 1px solid rgba(148, 163, 184, 0.4);
-            margin-top: 0.4rem;
-        }
-        .notion-table-row {
-            padding: 0.15rem 0.25rem;
-            border-bottom: 1px solid rgba(148, 163, 184, 0.18);
-        }
-        .notion-table-row:hover {
-            background-color: rgba(148, 163, 184, 0.12);
-        }
-        .nt-col-id, .nt-col-name, .nt-col-status, .nt-col-actions {
-            padding: 0.2rem 0.2rem;
-        }
-        .nt-cell-id {
-            font-feature-settings: "tnum" 1;
-            font-variant-numeric: tabular-nums;
-            color: rgba(148, 163, 184, 0.95);
-            font-size: 0.85rem;
-            padding-top: 0.2rem;
-        }
-        .nt-cell-name {
-            display: flex;
-            flex-direction: column;
-            gap: 2px;
-        }
-        .nt-name-main {
-            font-size: 0.95rem;
-            font-weight: 500;
-            color: var(--text-color);
-        }
-        .nt-name-sub {
-            font-size: 0.8rem;
-            color: rgba(148, 163, 184, 0.95);
-        }
-        .nt-pill {
-            display: inline-flex;
-            align-items: center;
-            padding: 1px 8px;
-            border-radius: 999px;
-            font-size: 0.78rem;
-            border: 1px solid rgba(148, 163, 184, 0.5);
-            background: rgba(148, 163, 184, 0.15);
-            color: var(--text-color);
-        }
-        .notion-empty {
-            padding: 0.8rem 0.4rem;
-            color: rgba(148, 163, 184, 0.95);
-            font-size: 0.9rem;
-        }
-
-        /* Recent logs on dashboard */
-        .notion-log-row {
-            border-radius: 10px;
-            border: 1px solid rgba(148, 163, 184, 0.4);
-            padding: 12px 16px;
-            margin-bottom: 12px;
-            background: var(--secondary-background-color);
-            display: flex;
-            align-items: center;
-        }
-        .notion-log-info {
-            display: flex;
-            flex-direction: column;
-            gap: 2px;
-        }
-        .notion-log-title {
-            font-size: 0.98rem;
-            font-weight: 600;
-            color: var(--text-color);
-        }
-        .notion-log-meta {
-            font-size: 0.78rem;
-            color: rgba(148, 163, 184, 0.95);
-        }
-
-        /* Generic text block */
-        .notion-text-block {
-            font-size: 0.95rem;
-            color: var(--text-color);
-        }
-        .notion-text-block ul {
-            padding-left: 1.2rem;
-        }
-        .notion-text-block li {
-            margin-bottom: 0.25rem;
-        }
-        .notion-text-block code {
-            background: rgba(148, 163, 184, 0.18);
-            padding: 2px 4px;
-            border-radius: 4px;
-            font-size: 0.85rem;
-        }
-
-        /* Buttons – soften a bit */
-        button[kind="primary"], button {
-            border-radius: 999px !important;
-            font-size: 0.82rem !important;
-        }
-
-        /* Dialogs wider */
-        [data-testid="stDialog"] > div {
-            align-items: center;
-        }
-        [data-testid="stDialog"] > div > div {
-            width: 1000px !important;
-            max-width: 95vw !important;
-        }
-        [data-testid="stDialog"] [data-testid="stVerticalBlock"] {
-            max-width: 980px !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
+    # Theme CSS is a static file (see .streamlit/config.toml); each rerun
+    # only sends this link, and the browser caches the stylesheet
+    st.markdown(THEME_LINK, unsafe_allow_html=True)
+
+    # Sidebar: title + workspace; ?workspace=<name> opens a team's workspace
+    st.sidebar.title("Workspace")
+    workspaces = list_workspaces()
+    if st.session_state.get("workspace") not in workspaces:
+        wanted = st.query_params.get("workspace")
+        st.session_state["workspace"] = wanted if wanted in workspaces else DEFAULT_WORKSPACE
+    workspace = st.sidebar.selectbox(
+        "Workspace", workspaces, key="workspace", label_visibility="collapsed"
     )
+    st.query_params["workspace"] = workspace
+    set_workspace(workspace)
+    if st.session_state.get("_workspace") != workspace:
+        # Loaded rows, table selection and undo belong to the previous workspace
+        for key in ("_rows", "_revisions", "_windows", "_queued_writes", "last_deleted", "logs_table_opened"):
+            st.session_state.pop(key, None)
+        st.session_state["_workspace"] = workspace
 
     # Init DB
-    init_db()
-
-    # Sidebar: title + quick add
-    st.sidebar.title("Workspace")
+    init_schema(current_path())
+    start_maintenance()
+    sync_revisions()
 
     page = st.sidebar.radio(
         "Navigate",
-        ["Dashboard", "Clients", "Logs / Tasks", "Settings"],
+        ["Dashboard", "Clients", "Logs / Tasks", "Workload", "Analytics",
+         "Calendar", "Integrations", "Modules", "Settings"],
         label_visibility="collapsed",
     )
 
@@ -568,15 +894,40 @@ def main():
     if st.sidebar.button("➕ Add Log"):
         quick_add_log_dialog()
 
+    # Undo for the last delete; older ones can be restored from Settings
+    if "last_deleted" in st.session_state:
+        kind, item_id, label = st.session_state["last_deleted"]
+        st.sidebar.caption(f"🗑️ Deleted {kind} “{label}”")
+        if st.sidebar.button("↩️ Undo Delete"):
+            restore = (restore_client if kind == "client" else restore_log)(item_id)
+            track_write(restore, "restore", kind, label)
+            del st.session_state["last_deleted"]
+            st.rerun()
+
+    # Async write mode: saves are acknowledged before they are committed
+    write_status()
+
     if page == "Dashboard":
         dashboard_page()
     elif page == "Clients":
         clients_page()
     elif page == "Logs / Tasks":
         logs_page()
+    elif page == "Workload":
+        workload_page()
+    elif page == "Analytics":
+        analytics_page()
+    elif page == "Calendar":
+        calendar_page()
+    elif page == "Integrations":
+        integrations_page()
+    elif page == "Modules":
+        modules_page()
     elif page == "Settings":
         settings_page()
 
+    stop_payload_meter(page)
+
 
 if __name__ == "__main__":
     main()
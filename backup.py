@@ -0,0 +1,162 @@
+# backup.py
+# Online snapshots of the tracker database using the SQLite backup API.
+# On a WAL database the copy is read from one open read transaction, so
+# it is a consistent snapshot and writers carry on meanwhile; without
+# one, every write from another connection would restart the copy from
+# page 1. Pages are copied in small steps with a short pause between
+# them, and a copy that runs past BACKUP_DEADLINE is abandoned. Each
+# workspace is backed up separately; snapshots are named after the
+# workspace's database file.
+# SQLite only: back up a server database with its own tools (pg_dump).
+# Usage: python backup.py [create | list | restore SNAPSHOT]
+import argparse
+import contextlib
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import db
+
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 10  # newest snapshots kept; older ones are rotated out
+BACKUP_STEP_PAGES = 256  # pages copied per step
+BACKUP_STEP_SLEEP = 0.005  # seconds slept between steps
+BACKUP_DEADLINE = 300  # seconds before an unfinished copy is abandoned
+
+
+@dataclass(slots=True)
+class BackupResult:
+    path: str
+    pages: int
+    bytes: int
+    seconds: float
+
+    @property
+    def mb_per_s(self):
+        return self.bytes / 1_048_576 / self.seconds if self.seconds else 0.0
+
+
+# backup()'s own sleep only applies after a BUSY or LOCKED step, so the
+# pause between steps is taken here. Raising from the callback aborts
+# the copy.
+def _copy(src, dst, progress=None):
+    t0 = time.perf_counter()
+
+    def step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+        if time.perf_counter() - t0 > BACKUP_DEADLINE:
+            raise TimeoutError(f"backup not finished after {BACKUP_DEADLINE} s")
+        time.sleep(BACKUP_STEP_SLEEP)
+
+    src.backup(dst, pages=BACKUP_STEP_PAGES, progress=step)
+    elapsed = time.perf_counter() - t0
+    pages = dst.execute("PRAGMA page_count;").fetchone()[0]
+    page_size = dst.execute("PRAGMA page_size;").fetchone()[0]
+    return pages, pages * page_size, elapsed
+
+
+def list_backups():
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    stem = os.path.splitext(os.path.basename(db.current_path()))[0]
+    # Match the whole timestamp, so workspace "a" never lists "a-b" snapshots
+    snapshot = re.compile(re.escape(stem) + r"-\d{8}-\d{6}-\d{6}\.db")
+    names = [n for n in os.listdir(BACKUP_DIR) if snapshot.fullmatch(n)]
+    # Timestamped names sort chronologically; newest first
+    return [os.path.join(BACKUP_DIR, n) for n in sorted(names, reverse=True)]
+
+
+def _rotate(keep=BACKUP_KEEP):
+    for path in list_backups()[keep:]:
+        os.remove(path)
+
+
+# Snapshot the live database into BACKUP_DIR. The copy is written to a
+# temporary name first, so a listed snapshot is always complete.
+def create_backup(progress=None):
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db.current_path()))[0]
+    path = os.path.join(BACKUP_DIR, f"{stem}-{datetime.now():%Y%m%d-%H%M%S-%f}.db")
+    tmp = path + ".part"
+
+    src = db._connect(db.current_path())
+    try:
+        dst = sqlite3.connect(tmp)
+        try:
+            # Pin a read snapshot. Only on WAL: in rollback-journal mode the
+            # open read would block every writer until the copy is done.
+            if src.execute("PRAGMA journal_mode;").fetchone()[0] == "wal":
+                src.execute("BEGIN;")
+                src.execute("SELECT 1 FROM sqlite_master LIMIT 1;").fetchone()
+            pages, size, elapsed = _copy(src, dst, progress)
+        finally:
+            dst.close()
+    except BaseException:
+        # An abandoned copy leaves no partial file behind
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    finally:
+        src.close()
+    os.replace(tmp, path)
+    _rotate()
+    return BackupResult(path, pages, size, elapsed)
+
+
+# Copy a snapshot back over the live database. The current state is
+# snapshotted first, so a restore can itself be undone.
+def restore_backup(path: str, progress=None):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+    safety = create_backup()
+
+    conn = db.get_connection()
+    if conn.in_transaction:
+        conn.commit()
+    src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        pages, size, elapsed = _copy(src, conn, progress)
+    finally:
+        src.close()
+    return BackupResult(path, pages, size, elapsed), safety
+
+
+def _report(verb: str, r: BackupResult):
+    print(
+        f"{verb} {r.path}: {r.pages} pages, {r.bytes / 1024:.0f} KiB "
+        f"in {r.seconds * 1000:.0f} ms ({r.mb_per_s:.1f} MiB/s)"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Back up or restore the tracker database.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("create", help="take a snapshot now")
+    sub.add_parser("list", help="list snapshots, newest first")
+    rp = sub.add_parser("restore", help="restore a snapshot over the live database")
+    rp.add_argument("snapshot")
+    ap.add_argument("--db", default=db.DB_PATH, help="database file of the default workspace")
+    ap.add_argument("--workspace", default=db.DEFAULT_WORKSPACE)
+    args = ap.parse_args()
+    db.DB_PATH = args.db
+    db.set_workspace(args.workspace)
+    if db.BACKEND.name != "sqlite":
+        raise SystemExit(f"backup.py is for SQLite; use the {db.BACKEND.name} server's own backup tools")
+
+    if args.cmd == "create":
+        _report("Created", create_backup())
+    elif args.cmd == "list":
+        for path in list_backups():
+            print(f"{path}  {os.path.getsize(path) / 1024:>9.0f} KiB")
+    else:
+        restored, safety = restore_backup(args.snapshot)
+        _report("Saved current state to", safety)
+        _report("Restored", restored)
+
+
+if __name__ == "__main__":
+    main()
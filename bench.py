@@ -0,0 +1,86 @@
+# bench.py
+# Read-path benchmark: time and memory of the list queries on a seeded
+# throwaway database. Usage: python bench.py --clients 2000 --logs 100000
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import db
+
+STATUSES = ["Not Started", "In Progress", "Blocked", "Completed"]
+
+
+def seed(n_clients: int, n_logs: int):
+    conn = db.get_connection()
+    rnd = random.Random(42)
+    start = date(2022, 1, 1)
+    conn.executemany(
+        "INSERT INTO clients (name, code, status, go_live_date, notes, kyc_bank) VALUES (?, ?, ?, ?, ?, ?);",
+        [
+            (f"Client {i}", f"C{i}", rnd.choice(["In Progress", "Completed"]),
+             (start + timedelta(days=rnd.randint(0, 1500))).isoformat(),
+             "notes " * 50, rnd.randint(0, 1))
+            for i in range(n_clients)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO client_logs (client_id, log_date, title, description, status, owner) VALUES (?, ?, ?, ?, ?, ?);",
+        [
+            (rnd.randint(1, n_clients),
+             (start + timedelta(days=rnd.randint(0, 1500))).isoformat(),
+             f"Task {i}", "description " * 20, rnd.choice(STATUSES), f"owner{rnd.randint(1, 40)}")
+            for i in range(n_logs)
+        ],
+    )
+    conn.commit()
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_row = current / len(rows) if rows else 0
+    print(
+        f"{label:<28} {len(rows):>8} rows {elapsed * 1000:>9.1f} ms "
+        f"retained {current / 1024:>9.0f} KiB ({per_row:>6.0f} B/row) "
+        f"peak {peak / 1024:>9.0f} KiB"
+    )
+    return rows
+
+
+def _raw_rows(sql: str):
+    cur = db.get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+    cur.execute(sql)
+    return cur.fetchall()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the list queries.")
+    ap.add_argument("--clients", type=int, default=2000)
+    ap.add_argument("--logs", type=int, default=100_000)
+    args = ap.parse_args()
+
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db.init_db()
+    seed(args.clients, args.logs)
+
+    measure("clients (sqlite3.Row)", lambda: _raw_rows("SELECT * FROM clients"))
+    measure("clients (Client model)", db.get_all_clients)
+    measure("logs (sqlite3.Row)", lambda: _raw_rows("SELECT * FROM client_logs"))
+    measure("logs (Log model)", db.get_all_logs)
+    measure("clients (list projection)", lambda: db.get_all_clients(columns=db.CLIENT_LIST))
+    measure("logs (list projection)", lambda: db.get_all_logs(columns=db.LOG_LIST))
+    measure("calendar (3 months)", lambda: db.client_milestones("2024-01-01", "2024-04-01"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,322 @@
 # db.py
+import contextlib
+import functools
+import logging
+import os
+import pathlib
+import queue
+import re
 import sqlite3
-from datetime import date
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
 
-DB_PATH = "client_tracker.db"
+import models
+import storage
+from models import (
+    CLIENT_FIELDS, INTEGRATION_FLAGS, LOG_FIELDS, MODULE_FIELDS, TO_DB,
+    MODEL_COLUMNS, Client, Log, Module, _pack, _unpack, load_row, load_rows, params_builder,
+)
+
+# SQLite by default; see storage.py for LOGBOOK_DATABASE_URL
+BACKEND = storage.from_env()
+if BACKEND.name != "sqlite":
+    models.COMPRESS_MIN_BYTES = None  # the server compresses large values itself
+
+DB_PATH = "client_tracker.db"  # file of the default workspace
+
+# Workspaces: one database file per delivery team, so teams never share a
+# writer lock. Extra workspaces live in WORKSPACE_DIR as <name>.db.
+WORKSPACE_DIR = os.environ.get("LOGBOOK_WORKSPACE_DIR", "workspaces")
+DEFAULT_WORKSPACE = "default"
+WORKSPACE_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,39}")
+MAX_ATTACHED = 10  # SQLite's default limit of attached databases
+
+# Route every mutation through one background writer thread
+ASYNC_WRITES = os.environ.get("LOGBOOK_ASYNC_WRITES", "0") == "1"
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_SIZE = 64
+
+log = logging.getLogger(__name__)
+
+# Soft delete: tombstones stay restorable for the undo window, then the
+# purger hard-deletes them in small batches
+SOFT_DELETE_TABLES = ("clients", "client_logs")
+UNDO_WINDOW_DAYS = 7
+PURGE_BATCH = 500
+DELETED_CLIENTS = "(SELECT id FROM clients WHERE deleted_at IS NOT NULL)"
+
+
+# SLA: logs sitting in one of these statuses for longer than this many days
+# are flagged. LOGBOOK_SLA_DAYS overrides them, e.g. "Blocked=7,In Progress=21"
+def _sla_days(spec: str):
+    pairs = (p.split("=", 1) for p in spec.split(",") if p.strip())
+    return {status.strip(): int(days) for status, days in pairs}
+
+
+SLA_DAYS = _sla_days(os.environ.get("LOGBOOK_SLA_DAYS", "Blocked=7,In Progress=21"))
+SLA_BATCH = 500
+SLA_OVERLAP = 60  # seconds re-read behind the checkpoint, for late commits
+
+# The mask expression, bit order from models.INTEGRATION_FLAGS
+INTEGRATION_MASK_SQL = " | ".join(
+    f"((COALESCE({col}, 0) != 0) << {bit})"
+    for bit, (col, _) in enumerate(INTEGRATION_FLAGS)
+)
+
+
+def _connect(path: str):
+    return BACKEND.connect(path)
+
+
+# ------- Workspace routing -------
+# The workspace is chosen per thread (every Streamlit rerun and every API
+# request runs on its own thread). Connections, pools and write queues
+# are kept per database file, so each workspace has its own writer.
+_local = threading.local()
+_conns, _pools, _writers = {}, {}, {}
+_registry_lock = threading.Lock()
+
+
+def workspace_path(name: str):
+    if name == DEFAULT_WORKSPACE:
+        return DB_PATH
+    if not WORKSPACE_NAME.fullmatch(name or ""):
+        raise ValueError(f"Invalid workspace name: {name!r}")
+    return os.path.join(WORKSPACE_DIR, f"{name}.db")
+
+
+def list_workspaces():
+    names = []
+    # A server database has no single writer lock to split: one workspace
+    if BACKEND.name == "sqlite" and os.path.isdir(WORKSPACE_DIR):
+        names = sorted(
+            n[:-3] for n in os.listdir(WORKSPACE_DIR)
+            if n.endswith(".db") and WORKSPACE_NAME.fullmatch(n[:-3]) and n[:-3] != DEFAULT_WORKSPACE
+        )
+    return [DEFAULT_WORKSPACE, *names]
+
+
+def current_workspace():
+    return getattr(_local, "workspace", None) or DEFAULT_WORKSPACE
+
+
+def current_path():
+    return workspace_path(current_workspace())
+
+
+def set_workspace(name: str):
+    workspace_path(name)  # validates the name
+    _local.workspace = name
+
+
+@contextlib.contextmanager
+def use_workspace(name: str):
+    outer = getattr(_local, "workspace", None)
+    set_workspace(name)
+    try:
+        yield
+    finally:
+        _local.workspace = outer
+
+
+# Creates the file and its schema; returns the workspace name
+def create_workspace(name: str):
+    name = name.strip()
+    if BACKEND.name != "sqlite":
+        raise ValueError(f"Workspaces are separate SQLite files; the {BACKEND.name} backend has one database")
+    path = workspace_path(name)
+    # The default file's stem is reserved too: backups are named by stem
+    if name in (DEFAULT_WORKSPACE, os.path.splitext(os.path.basename(DB_PATH))[0]) or os.path.exists(path):
+        raise ValueError(f"Workspace name {name!r} is already taken")
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    with use_workspace(name):
+        init_db()
+    return name
+
+
+def _per_path(registry: dict, factory):
+    path = current_path()
+    obj = registry.get(path)
+    if obj is None:
+        with _registry_lock:
+            obj = registry.get(path)
+            if obj is None:
+                obj = registry[path] = factory(path)
+    return obj
 
 
 def get_connection():
-    if "conn" not in globals():
-        global conn
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    # Inside pooled() the calling thread uses its borrowed connection
+    borrowed = getattr(_local, "conn", None)
+    if borrowed is not None:
+        return borrowed
+    return _per_path(_conns, _connect)
+
+
+# ------- Connection pool -------
+# For callers outside Streamlit (api.py) that run many requests in
+# parallel threads: each request borrows its own connection instead of
+# sharing the global one.
+POOL_SIZE = 8
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size=POOL_SIZE):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        self.slots.acquire()
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = _connect(self.path)
+            BACKEND.enable_wal(conn)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle.put(conn)
+            self.slots.release()
+
+
+def _pool():
+    return _per_path(_pools, ConnectionPool)
+
+
+# Run the db calls in this block on a connection borrowed from the pool
+@contextlib.contextmanager
+def pooled():
+    with _pool().connection() as borrowed:
+        outer = getattr(_local, "conn", None)
+        _local.conn = borrowed
+        try:
+            yield borrowed
+        finally:
+            _local.conn = outer
+
+
+# ------- Writes -------
+class WriteQueue:
+    # Single writer thread with its own connection. Queued mutations are
+    # group-committed: one transaction per batch, one savepoint per
+    # mutation so a failing write only fails its own future.
+
+    def __init__(self, path: str, maxsize=WRITE_QUEUE_SIZE, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, args=(), kwargs=None):
+        fut = Future()
+        # Blocks when the queue is full, which pushes back on the callers
+        self.queue.put((fn, args, kwargs or {}, fut))
+        return fut
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _run(self):
+        conn = _connect(self.path)
+        conn.isolation_level = None
+        # WAL lets the UI connection keep reading while the writer commits
+        BACKEND.enable_wal(conn)
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(conn, batch)
 
+    def _commit(self, conn, batch):
+        cur = conn.cursor()
+        done = []
+        try:
+            cur.execute("BEGIN IMMEDIATE;")
+            for fn, args, kwargs, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                cur.execute("SAVEPOINT write;")
+                try:
+                    result = fn(cur, *args, **kwargs)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO write;")
+                    cur.execute("RELEASE write;")
+                    log.warning("Queued write %s failed: %s", fn.__name__, e)
+                    fut.set_exception(e)
+                else:
+                    cur.execute("RELEASE write;")
+                    done.append((fut, result))
+            cur.execute("COMMIT;")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            log.error("Write batch of %d failed: %s", len(batch), e)
+            for fut, _ in done:
+                fut.set_exception(e)
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        # Futures resolve only once the batch is durable
+        for fut, result in done:
+            fut.set_result(result)
 
+
+def _writer():
+    return _per_path(_writers, WriteQueue)
+
+
+def pending_writes():
+    return _writer().pending() if ASYNC_WRITES else 0
+
+
+def mutation(fn):
+    # Write functions take a cursor as first argument; callers omit it.
+    # Returns a Future: already resolved in synchronous mode, resolved by
+    # the writer thread after its group commit in async mode.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if ASYNC_WRITES:
+            return _writer().submit(fn, args, kwargs)
+
+        conn = get_connection()
+        cur = conn.cursor()
+        try:
+            BACKEND.begin(conn)
+            result = fn(cur, *args, **kwargs)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        fut = Future()
+        fut.set_result(result)
+        return fut
+
+    return wrapper
+
+
+# The SQLite schema and its migrations; other backends bring their own
+# schema (storage.py)
 def init_db():
     conn = get_connection()
+    if BACKEND.name != "sqlite":
+        return BACKEND.init_schema(conn)
     cur = conn.cursor()
 
+    # Only takes effect on a new, empty file; existing files are switched
+    # by maintenance.compact()
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL;")
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS clients (
@@ -52,18 +351,42 @@ def init_db():
         """
     )
 
+    # Catalog of module names, shared by all clients
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+        """
+    )
+
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS client_modules (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             client_id INTEGER NOT NULL,
-            module_name TEXT NOT NULL,
+            module_id INTEGER NOT NULL,
             customizations TEXT,
             is_live INTEGER DEFAULT 0,
-            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE,
+            FOREIGN KEY (module_id) REFERENCES modules(id)
         )
         """
     )
+    _migrate_module_catalog(cur)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_client_modules_module
+        ON client_modules (module_id, is_live, client_id)
+        """
+    )
+    # Each module at most once per client
+    _merge_duplicate_modules(cur)
+    _ensure_schema(
+        cur, "idx_client_modules_client",
+        "CREATE UNIQUE INDEX idx_client_modules_client ON client_modules (client_id, module_id)",
+    )
 
     cur.execute(
         """
@@ -81,253 +404,1877 @@ def init_db():
         """
     )
 
-    conn.commit()
+    # Packed integration flags so multi-flag filters are one indexed lookup
+    _ensure_column(
+        cur, "clients", "integration_mask",
+        f"INTEGER GENERATED ALWAYS AS ({INTEGRATION_MASK_SQL}) VIRTUAL",
+    )
 
+    # Row versions for optimistic concurrency on edits
+    for table in ("clients", "client_logs", "client_modules"):
+        _ensure_column(cur, table, "version", "INTEGER NOT NULL DEFAULT 1")
 
-# ------- Clients -------
-def get_all_clients():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM clients ORDER BY name COLLATE NOCASE;")
-    return cur.fetchall()
+    # Soft delete: tombstoned rows keep a deleted_at timestamp until the
+    # purger removes them. The list indexes only cover live rows, so
+    # tombstones cost nothing on normal reads.
+    for table in SOFT_DELETE_TABLES:
+        _ensure_column(cur, table, "deleted_at", "TEXT")
+        _ensure_schema(
+            cur, f"idx_{table}_tombstones",
+            f"CREATE INDEX idx_{table}_tombstones ON {table} (deleted_at) WHERE deleted_at IS NOT NULL",
+        )
+    _ensure_schema(
+        cur, "idx_clients_integration_mask",
+        "CREATE INDEX idx_clients_integration_mask ON clients (integration_mask, status) "
+        "WHERE deleted_at IS NULL",
+    )
+    _ensure_schema(
+        cur, "idx_clients_live_name",
+        "CREATE INDEX idx_clients_live_name ON clients (name COLLATE NOCASE) "
+        "WHERE deleted_at IS NULL",
+    )
+    _ensure_schema(
+        cur, "idx_logs_live_date",
+        "CREATE INDEX idx_logs_live_date ON client_logs (log_date, id) "
+        "WHERE deleted_at IS NULL",
+    )
+    # Title prefix lookups from the logs page (LIKE 'abc%' becomes a range seek)
+    _ensure_schema(
+        cur, "idx_logs_live_title",
+        "CREATE INDEX idx_logs_live_title ON client_logs (title COLLATE NOCASE) "
+        "WHERE deleted_at IS NULL",
+    )
+    # Per-client log lookups, including tombstones (the purger walks these)
+    _ensure_schema(
+        cur, "idx_logs_client",
+        "CREATE INDEX idx_logs_client ON client_logs (client_id)",
+    )
 
+    # Calendar windows: one range seek per milestone kind, covering the
+    # columns the calendar shows
+    for column, index in MILESTONE_INDEXES.items():
+        _ensure_schema(
+            cur, index,
+            f"CREATE INDEX {index} ON clients ({column}, name, status) "
+            f"WHERE deleted_at IS NULL AND {column} IS NOT NULL",
+        )
 
-def get_client_by_id(cid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM clients WHERE id = ?;", (cid,))
-    return cur.fetchone()
+    # Covering index for the owner workload report (no table lookups needed;
+    # deleted_at is carried along only so the planner sees it as covering)
+    _ensure_schema(
+        cur, "idx_logs_owner_status_date",
+        "CREATE INDEX idx_logs_owner_status_date "
+        "ON client_logs (owner, status, log_date, client_id, deleted_at) "
+        "WHERE deleted_at IS NULL",
+    )
 
+    init_rollups(cur)
+    init_sla(cur)
+    init_status_history(cur)
+    init_completions(cur)
+    init_client_names(cur)
 
-def create_client(data: dict):
-    conn = get_connection()
-    cur = conn.cursor()
+    # Small key/value store for bookkeeping (e.g. last maintenance runs)
     cur.execute(
         """
-        INSERT INTO clients
-        (name, code, status, po_date, initial_training_date, go_live_date,
-         fame_version, pocket_fame, state,
-         initial_manpower, num_users, num_branches,
-         proforma_integration, einvoice_integration, kyc_aadhaar, kyc_bank,
-         sms_integration, sendmail_payslips, sendmail_invoice, bank_integration,
-         psf, contact_name, contact_designation, contact_phone, contact_email,
-         notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            data["name"],
-            data.get("code"),
-            data.get("status"),
-            data.get("po_date"),
-            data.get("initial_training_date"),
-            data.get("go_live_date"),
-            data.get("fame_version"),
-            1 if data.get("pocket_fame") else 0,
-            data.get("state"),
-            data.get("initial_manpower"),
-            data.get("num_users"),
-            data.get("num_branches"),
-            1 if data.get("proforma_integration") else 0,
-            1 if data.get("einvoice_integration") else 0,
-            1 if data.get("kyc_aadhaar") else 0,
-            1 if data.get("kyc_bank") else 0,
-            1 if data.get("sms_integration") else 0,
-            1 if data.get("sendmail_payslips") else 0,
-            1 if data.get("sendmail_invoice") else 0,
-            1 if data.get("bank_integration") else 0,
-            data.get("psf"),
-            data.get("contact_name"),
-            data.get("contact_designation"),
-            data.get("contact_phone"),
-            data.get("contact_email"),
-            data.get("notes"),
-        ),
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID
+        """
     )
+
+    init_revisions(cur)
+
     conn.commit()
 
 
-def update_client(cid: int, data: dict):
-    conn = get_connection()
-    cur = conn.cursor()
+# Returns True when the column was added
+def _ensure_column(cur, table: str, column: str, decl: str):
+    # table_xinfo also lists generated columns
+    cur.execute(f"PRAGMA table_xinfo({table});")
+    if column not in {r[1] for r in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl};")
+        return True
+    return False
+
+
+# Create a trigger or index, replacing it if its definition changed.
+# `sql` is the CREATE statement without IF NOT EXISTS.
+def _ensure_schema(cur, name: str, sql: str):
+    cur.execute("SELECT type, sql FROM sqlite_master WHERE name = ?;", (name,))
+    row = cur.fetchone()
+    if row and row[1].split() == sql.split():
+        return
+    if row:
+        cur.execute(f"DROP {row[0].upper()} {name};")
+    cur.execute(sql)
+
+
+# Older databases stored the module name as free text on every
+# client_modules row. Move the distinct names (case-insensitively) into
+# the modules catalog and rebuild client_modules to reference it by id.
+def _migrate_module_catalog(cur):
+    cur.execute("PRAGMA table_info(client_modules);")
+    if "module_name" not in {r[1] for r in cur.fetchall()}:
+        return
+
     cur.execute(
         """
-        UPDATE clients
-        SET name=?, code=?, status=?, po_date=?, initial_training_date=?,
-            go_live_date=?, fame_version=?, pocket_fame=?, state=?,
-            initial_manpower=?, num_users=?, num_branches=?,
-            proforma_integration=?, einvoice_integration=?, kyc_aadhaar=?, kyc_bank=?,
-            sms_integration=?, sendmail_payslips=?, sendmail_invoice=?, bank_integration=?,
-            psf=?, contact_name=?, contact_designation=?, contact_phone=?, contact_email=?,
-            notes=?
-        WHERE id=?
-        """,
-        (
-            data["name"],
-            data.get("code"),
-            data.get("status"),
-            data.get("po_date"),
-            data.get("initial_training_date"),
-            data.get("go_live_date"),
-            data.get("fame_version"),
-            1 if data.get("pocket_fame") else 0,
-            data.get("state"),
-            data.get("initial_manpower"),
-            data.get("num_users"),
-            data.get("num_branches"),
-            1 if data.get("proforma_integration") else 0,
-            1 if data.get("einvoice_integration") else 0,
-            1 if data.get("kyc_aadhaar") else 0,
-            1 if data.get("kyc_bank") else 0,
-            1 if data.get("sms_integration") else 0,
-            1 if data.get("sendmail_payslips") else 0,
-            1 if data.get("sendmail_invoice") else 0,
-            1 if data.get("bank_integration") else 0,
-            data.get("psf"),
-            data.get("contact_name"),
-            data.get("contact_designation"),
-            data.get("contact_phone"),
-            data.get("contact_email"),
-            data.get("notes"),
-            cid,
-        ),
+        INSERT OR IGNORE INTO modules (name)
+        SELECT TRIM(module_name) FROM client_modules ORDER BY id
+        """
     )
-    conn.commit()
+    cur.execute(
+        """
+        CREATE TABLE client_modules_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            customizations TEXT,
+            is_live INTEGER DEFAULT 0,
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE,
+            FOREIGN KEY (module_id) REFERENCES modules(id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO client_modules_new (id, client_id, module_id, customizations, is_live)
+        SELECT cm.id, cm.client_id, m.id, cm.customizations, cm.is_live
+        FROM client_modules cm
+        JOIN modules m ON m.name = TRIM(cm.module_name)
+        """
+    )
+    cur.execute("DROP TABLE client_modules;")
+    cur.execute("ALTER TABLE client_modules_new RENAME TO client_modules;")
 
 
-def delete_client(cid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM clients WHERE id=?;", (cid,))
-    conn.commit()
+# Names that differ only in case or spacing (" Payroll " and "payroll")
+# share a catalog entry, so a client could end up with the same module
+# twice. Like the names, the first row wins: it is kept, LIVE if any of
+# the copies was, with the notes of all of them.
+def _merge_duplicate_modules(cur):
+    cur.execute(
+        "SELECT client_id, module_id FROM client_modules GROUP BY 1, 2 HAVING COUNT(*) > 1;"
+    )
+    for cid, mid in cur.fetchall():
+        cur.execute(
+            "SELECT id, customizations, is_live FROM client_modules "
+            "WHERE client_id = ? AND module_id = ? ORDER BY id;",
+            (cid, mid),
+        )
+        rows = cur.fetchall()
+        notes = dict.fromkeys(n for n in (_unpack(r[1]) for r in rows) if n)
+        cur.execute(
+            "UPDATE client_modules SET customizations = ?, is_live = ? WHERE id = ?;",
+            (_pack("\n\n".join(notes) or None), int(any(r[2] for r in rows)), rows[0][0]),
+        )
+        cur.execute(
+            "DELETE FROM client_modules WHERE client_id = ? AND module_id = ? AND id != ?;",
+            (cid, mid, rows[0][0]),
+        )
 
 
-# ------- Modules -------
-def get_modules_for_client(cid: int):
-    conn = get_connection()
-    cur = conn.cursor()
+# ------- Rollups -------
+# Pre-bucketed counters for the analytics page. They are kept current by
+# triggers on every insert/update/delete instead of being recomputed.
+LOG_BUCKETS = {
+    "log_rollup_daily": "COALESCE(date({r}.log_date), '')",
+    "log_rollup_weekly": "COALESCE(date({r}.log_date, 'weekday 0', '-6 days'), '')",
+}
+
+
+def _table_exists(cur, name: str):
     cur.execute(
-        "SELECT * FROM client_modules WHERE client_id=? ORDER BY module_name COLLATE NOCASE;",
-        (cid,),
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (name,)
     )
-    return cur.fetchall()
+    return cur.fetchone() is not None
 
 
-def create_module(cid: int, name: str, custom: str, is_live: bool):
-    conn = get_connection()
-    cur = conn.cursor()
+def _log_bucket_sql(row: str, sign: str):
+    stmts = []
+    for table, bucket in LOG_BUCKETS.items():
+        key = bucket.format(r=row)
+        if sign == "+":
+            stmts.append(
+                f"""
+                INSERT INTO {table} (bucket, client_id, status, n)
+                VALUES ({key}, {row}.client_id, COALESCE({row}.status, ''), 1)
+                ON CONFLICT (bucket, client_id, status) DO UPDATE SET n = n + 1;
+                """
+            )
+        else:
+            stmts.append(
+                f"""
+                UPDATE {table} SET n = n - 1
+                WHERE bucket = {key} AND client_id = {row}.client_id
+                  AND status = COALESCE({row}.status, '');
+                """
+            )
+    return "".join(stmts)
+
+
+def init_rollups(cur):
+    fresh = not _table_exists(cur, "log_rollup_daily")
+
+    for table in LOG_BUCKETS:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                client_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                n INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, client_id, status)
+            ) WITHOUT ROWID
+            """
+        )
+
+    # Completed logs per week, and for the `timed` ones among them the total
+    # days from In Progress to completion
     cur.execute(
-        "INSERT INTO client_modules (client_id, module_name, customizations, is_live) VALUES (?, ?, ?, ?);",
-        (cid, name, custom, 1 if is_live else 0),
+        """
+        CREATE TABLE IF NOT EXISTS log_completion_weekly (
+            bucket TEXT NOT NULL,
+            client_id INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            total_days REAL NOT NULL DEFAULT 0,
+            timed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, client_id)
+        ) WITHOUT ROWID
+        """
     )
-    conn.commit()
 
-def update_module(mid: int, data: dict):
-    conn = get_connection()
-    cur = conn.cursor()
     cur.execute(
         """
-        UPDATE client_modules
-        SET module_name = ?, customizations = ?, is_live = ?
-        WHERE id = ?
-        """,
-        (
-            data["module_name"],
-            data.get("customizations"),
-            1 if data.get("is_live") else 0,
-            mid,
-        ),
+        CREATE TABLE IF NOT EXISTS client_golive_monthly (
+            bucket TEXT NOT NULL,
+            status TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, status)
+        ) WITHOUT ROWID
+        """
     )
-    conn.commit()
 
+    _ensure_schema(
+        cur, "trg_logs_rollup_ins",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_ins
+        AFTER INSERT ON client_logs
+        BEGIN
+            {_log_bucket_sql("NEW", "+")}
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_rollup_del",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_del
+        AFTER DELETE ON client_logs
+        WHEN OLD.deleted_at IS NULL
+        BEGIN
+            {_log_bucket_sql("OLD", "-")}
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_rollup_upd",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_upd
+        AFTER UPDATE OF log_date, status, client_id ON client_logs
+        WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NULL
+        BEGIN
+            {_log_bucket_sql("OLD", "-")}
+            {_log_bucket_sql("NEW", "+")}
+        END
+        """
+    )
 
-def delete_module(mid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM client_modules WHERE id=?;", (mid,))
-    conn.commit()
+    golive = "COALESCE(strftime('%Y-%m', {r}.go_live_date), '')"
+    _ensure_schema(
+        cur, "trg_clients_golive_ins",
+        f"""
+        CREATE TRIGGER trg_clients_golive_ins
+        AFTER INSERT ON clients
+        BEGIN
+            INSERT INTO client_golive_monthly (bucket, status, n)
+            VALUES ({golive.format(r="NEW")}, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (bucket, status) DO UPDATE SET n = n + 1;
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_clients_golive_del",
+        f"""
+        CREATE TRIGGER trg_clients_golive_del
+        AFTER DELETE ON clients
+        WHEN OLD.deleted_at IS NULL
+        BEGIN
+            UPDATE client_golive_monthly SET n = n - 1
+            WHERE bucket = {golive.format(r="OLD")} AND status = COALESCE(OLD.status, '');
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_clients_golive_upd",
+        f"""
+        CREATE TRIGGER trg_clients_golive_upd
+        AFTER UPDATE OF go_live_date, status ON clients
+        WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NULL
+        BEGIN
+            UPDATE client_golive_monthly SET n = n - 1
+            WHERE bucket = {golive.format(r="OLD")} AND status = COALESCE(OLD.status, '');
+            INSERT INTO client_golive_monthly (bucket, status, n)
+            VALUES ({golive.format(r="NEW")}, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (bucket, status) DO UPDATE SET n = n + 1;
+        END
+        """
+    )
 
+    # Tombstoning a row takes it out of the rollups; restoring puts it back
+    _ensure_schema(
+        cur, "trg_logs_rollup_softdel",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_softdel
+        AFTER UPDATE OF deleted_at ON client_logs
+        WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+        BEGIN
+            {_log_bucket_sql("OLD", "-")}
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_rollup_restore",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_restore
+        AFTER UPDATE OF deleted_at ON client_logs
+        WHEN OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL
+        BEGIN
+            {_log_bucket_sql("NEW", "+")}
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_clients_golive_softdel",
+        f"""
+        CREATE TRIGGER trg_clients_golive_softdel
+        AFTER UPDATE OF deleted_at ON clients
+        WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+        BEGIN
+            UPDATE client_golive_monthly SET n = n - 1
+            WHERE bucket = {golive.format(r="OLD")} AND status = COALESCE(OLD.status, '');
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_clients_golive_restore",
+        f"""
+        CREATE TRIGGER trg_clients_golive_restore
+        AFTER UPDATE OF deleted_at ON clients
+        WHEN OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL
+        BEGIN
+            INSERT INTO client_golive_monthly (bucket, status, n)
+            VALUES ({golive.format(r="NEW")}, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (bucket, status) DO UPDATE SET n = n + 1;
+        END
+        """
+    )
 
-# ------- Logs -------
-def get_all_logs(status_filter="All", client_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    query = "SELECT * FROM client_logs"
-    cond = []
-    params = []
+    if fresh:
+        rebuild_rollups(cur)
 
-    if status_filter != "All":
-        cond.append("status = ?")
-        params.append(status_filter)
-    if client_id is not None:
-        cond.append("client_id = ?")
-        params.append(client_id)
 
-    if cond:
-        query += " WHERE " + " AND ".join(cond)
-    query += " ORDER BY log_date DESC, id DESC;"
+# One-off full rebuild; only needed when the rollup tables are first created
+def rebuild_rollups(cur):
+    for table, bucket in LOG_BUCKETS.items():
+        key = bucket.format(r="client_logs")
+        cur.execute(f"DELETE FROM {table};")
+        cur.execute(
+            f"""
+            INSERT INTO {table} (bucket, client_id, status, n)
+            SELECT {key}, client_id, COALESCE(status, ''), COUNT(*)
+            FROM client_logs
+            WHERE deleted_at IS NULL
+            GROUP BY 1, 2, 3
+            """
+        )
 
-    cur.execute(query, tuple(params))
-    return cur.fetchall()
+    cur.execute("DELETE FROM client_golive_monthly;")
+    cur.execute(
+        """
+        INSERT INTO client_golive_monthly (bucket, status, n)
+        SELECT COALESCE(strftime('%Y-%m', go_live_date), ''), COALESCE(status, ''), COUNT(*)
+        FROM clients
+        WHERE deleted_at IS NULL
+        GROUP BY 1, 2
+        """
+    )
 
 
-def get_logs_for_client(cid: int):
-    return get_all_logs(client_id=cid)
+# Completions: when a log first reaches 'Completed', and before that
+# 'In Progress', is kept on the log (completed_at, started_at), so
+# reopening and completing it again counts once. These are the moments the
+# status history records, so the days here match the cycle time below. A
+# log is `timed` when it was In Progress before it completed.
+# log_completion_weekly counts live logs with a completed_at, by the week
+# of that date; the triggers move a log out of and back into it as it is
+# deleted, restored, purged, moved or restarted. It is rebuilt only once,
+# when a column is added.
+COMPLETION_BUCKET = "date({r}.completed_at, 'weekday 0', '-6 days')"
+COMPLETION_TIMED = "COALESCE({r}.started_at <= {r}.completed_at, 0)"
+COMPLETION_DAYS = (
+    "CASE WHEN {r}.started_at <= {r}.completed_at "
+    "THEN julianday({r}.completed_at) - julianday({r}.started_at) ELSE 0 END"
+)
 
 
-def get_log_by_id(lid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM client_logs WHERE id=?;", (lid,))
-    return cur.fetchone()
+def _completion_sql(row: str, sign: str):
+    bucket, days = COMPLETION_BUCKET.format(r=row), COMPLETION_DAYS.format(r=row)
+    timed = COMPLETION_TIMED.format(r=row)
+    counted = f"{row}.completed_at IS NOT NULL AND {row}.deleted_at IS NULL"
+    if sign == "+":
+        return f"""
+            INSERT INTO log_completion_weekly (bucket, client_id, completed, timed, total_days)
+            SELECT {bucket}, {row}.client_id, 1, {timed}, {days}
+            WHERE {counted}
+            ON CONFLICT (bucket, client_id) DO UPDATE SET
+                completed = completed + 1,
+                timed = timed + excluded.timed,
+                total_days = total_days + excluded.total_days;
+            """
+    return f"""
+            UPDATE log_completion_weekly
+            SET completed = completed - 1, timed = timed - {timed}, total_days = total_days - {days}
+            WHERE {counted} AND bucket = {bucket} AND client_id = {row}.client_id;
+            """
 
 
-def create_log(data: dict):
-    conn = get_connection()
-    cur = conn.cursor()
+def init_completions(cur):
+    rebuild = _ensure_column(cur, "log_completion_weekly", "timed", "INTEGER NOT NULL DEFAULT 0")
+    if _ensure_column(cur, "client_logs", "completed_at", "TEXT"):
+        # Existing logs: their first recorded completion, else the last
+        # change of a log that is completed now
+        cur.execute(
+            """
+            UPDATE client_logs SET completed_at = COALESCE(
+                (SELECT MIN(changed_at) FROM log_status_history h
+                 WHERE h.log_id = client_logs.id AND h.status = 'Completed'),
+                updated_at, datetime(log_date), datetime('now'))
+            WHERE status = 'Completed' OR id IN (
+                SELECT log_id FROM log_status_history WHERE status = 'Completed');
+            """
+        )
+        rebuild = True
+    if _ensure_column(cur, "client_logs", "started_at", "TEXT"):
+        cur.execute(
+            """
+            UPDATE client_logs SET started_at = (
+                SELECT MIN(changed_at) FROM log_status_history h
+                WHERE h.log_id = client_logs.id AND h.status = 'In Progress'
+                  AND (client_logs.completed_at IS NULL OR h.changed_at <= client_logs.completed_at))
+            WHERE id IN (SELECT log_id FROM log_status_history WHERE status = 'In Progress');
+            """
+        )
+        rebuild = True
+    if rebuild:
+        rebuild_completions(cur)
+    for name, column, event, when in (
+        ("trg_logs_started_ins", "started_at", "INSERT", "NEW.status = 'In Progress'"),
+        ("trg_logs_started_upd", "started_at", "UPDATE OF status",
+         "NEW.status = 'In Progress' AND NEW.started_at IS NULL AND NEW.completed_at IS NULL"),
+        ("trg_logs_completed_ins", "completed_at", "INSERT", "NEW.status = 'Completed'"),
+        ("trg_logs_completed_upd", "completed_at", "UPDATE OF status",
+         "NEW.status = 'Completed' AND NEW.completed_at IS NULL"),
+    ):
+        _ensure_schema(
+            cur, name,
+            f"""
+            CREATE TRIGGER {name}
+            AFTER {event} ON client_logs
+            WHEN {when}
+            BEGIN
+                UPDATE client_logs SET {column} = datetime('now') WHERE id = NEW.id;
+            END
+            """
+        )
+    _ensure_schema(
+        cur, "trg_logs_rollup_completed",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_completed
+        AFTER UPDATE OF completed_at, started_at, client_id, deleted_at ON client_logs
+        WHEN (OLD.completed_at IS NOT NULL OR NEW.completed_at IS NOT NULL)
+          AND (OLD.completed_at IS NOT NEW.completed_at OR OLD.started_at IS NOT NEW.started_at
+               OR OLD.client_id IS NOT NEW.client_id OR OLD.deleted_at IS NOT NEW.deleted_at)
+        BEGIN
+            {_completion_sql("OLD", "-")}
+            {_completion_sql("NEW", "+")}
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_rollup_completed_del",
+        f"""
+        CREATE TRIGGER trg_logs_rollup_completed_del
+        AFTER DELETE ON client_logs
+        WHEN OLD.completed_at IS NOT NULL AND OLD.deleted_at IS NULL
+        BEGIN
+            {_completion_sql("OLD", "-")}
+        END
+        """
+    )
+
+
+def rebuild_completions(cur):
+    cur.execute("DELETE FROM log_completion_weekly;")
     cur.execute(
+        f"""
+        INSERT INTO log_completion_weekly (bucket, client_id, completed, timed, total_days)
+        SELECT {COMPLETION_BUCKET.format(r="l")}, l.client_id, COUNT(*),
+               SUM({COMPLETION_TIMED.format(r="l")}), SUM({COMPLETION_DAYS.format(r="l")})
+        FROM client_logs l
+        WHERE l.completed_at IS NOT NULL AND l.deleted_at IS NULL
+        GROUP BY 1, 2
         """
-        INSERT INTO client_logs
-        (client_id, log_date, title, description, status, owner, remarks)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            data["client_id"],
-            data.get("log_date"),
-            data["title"],
-            data.get("description"),
-            data.get("status"),
-            data.get("owner"),
-            data.get("remarks"),
-        ),
     )
-    conn.commit()
 
 
-def update_log(lid: int, data: dict):
-    conn = get_connection()
-    cur = conn.cursor()
+# ------- Revisions -------
+# Per-table counters bumped by triggers on every row change, from any
+# connection or process. Readers that keep rows around (the session
+# identity map in views.py) compare them to know when to reload.
+REVISION_TABLES = ("clients", "client_logs", "client_modules")
+
+
+def init_revisions(cur):
     cur.execute(
         """
-        UPDATE client_logs
-        SET log_date=?, title=?, description=?, status=?, owner=?, remarks=?
-        WHERE id=?
-        """,
-        (
-            data.get("log_date"),
-            data["title"],
-            data.get("description"),
-            data.get("status"),
-            data.get("owner"),
-            data.get("remarks"),
-            lid,
-        ),
+        CREATE TABLE IF NOT EXISTS table_revisions (
+            name TEXT PRIMARY KEY,
+            rev INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
     )
-    conn.commit()
+    for table in REVISION_TABLES:
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            name = f"trg_{table}_rev_{op.lower()}"
+            _ensure_schema(
+                cur, name,
+                f"""
+                CREATE TRIGGER {name}
+                AFTER {op} ON {table}
+                BEGIN
+                    INSERT INTO table_revisions (name, rev) VALUES ('{table}', 1)
+                    ON CONFLICT (name) DO UPDATE SET rev = rev + 1;
+                END
+                """
+            )
 
 
-def delete_log(lid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM client_logs WHERE id=?;", (lid,))
-    conn.commit()
+# Last-change time of each log, so the SLA scan (see below) only reads
+# logs changed since its checkpoint. Set on insert and on every versioned
+# write (edits, deletes, restores); maintenance rewrites such as long text
+# compression leave it alone. log_sla holds the logs currently in an SLA
+# status and since when.
+def init_sla(cur):
+    if _ensure_column(cur, "client_logs", "updated_at", "TEXT"):
+        # Best guess for existing logs: the day they were logged
+        cur.execute(
+            "UPDATE client_logs SET updated_at = COALESCE(datetime(log_date), datetime('now'));"
+        )
+    _ensure_schema(
+        cur, "idx_logs_updated",
+        "CREATE INDEX idx_logs_updated ON client_logs (updated_at)",
+    )
+    _ensure_schema(
+        cur, "trg_logs_touch_ins",
+        """
+        CREATE TRIGGER trg_logs_touch_ins
+        AFTER INSERT ON client_logs
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE client_logs SET updated_at = datetime('now') WHERE id = NEW.id;
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_touch_upd",
+        """
+        CREATE TRIGGER trg_logs_touch_upd
+        AFTER UPDATE OF version ON client_logs
+        BEGIN
+            UPDATE client_logs SET updated_at = datetime('now') WHERE id = NEW.id;
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS log_sla (
+            log_id INTEGER PRIMARY KEY REFERENCES client_logs(id) ON DELETE CASCADE,
+            client_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            since TEXT NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_log_sla_status_since ON log_sla (status, since);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_log_sla_client ON log_sla (client_id);")
+
+
+# Append-only status history: a row when a log is created and one on every
+# status change. A log changed before it has any history (it predates the
+# table) first gets its old status as of its last change, so the time spent
+# in that status is not lost; the backfill below seeds the rest.
+def init_status_history(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS log_status_history (
+            id INTEGER PRIMARY KEY,
+            log_id INTEGER NOT NULL REFERENCES client_logs(id) ON DELETE CASCADE,
+            status TEXT NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_status_history_log ON log_status_history (log_id, changed_at);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_status_history_changed ON log_status_history (changed_at);"
+    )
+    _ensure_schema(
+        cur, "trg_logs_history_ins",
+        """
+        CREATE TRIGGER trg_logs_history_ins
+        AFTER INSERT ON client_logs
+        BEGIN
+            INSERT INTO log_status_history (log_id, status, changed_at)
+            VALUES (NEW.id, COALESCE(NEW.status, ''), datetime('now'));
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_logs_history_upd",
+        """
+        CREATE TRIGGER trg_logs_history_upd
+        AFTER UPDATE OF status ON client_logs
+        WHEN NEW.status IS NOT OLD.status
+        BEGIN
+            INSERT INTO log_status_history (log_id, status, changed_at)
+            SELECT OLD.id, COALESCE(OLD.status, ''), COALESCE(OLD.updated_at, datetime(OLD.log_date), datetime('now'))
+            WHERE NOT EXISTS (SELECT 1 FROM log_status_history WHERE log_id = OLD.id);
+            INSERT INTO log_status_history (log_id, status, changed_at)
+            VALUES (NEW.id, COALESCE(NEW.status, ''), datetime('now'));
+        END
+        """
+    )
+
 
+# Duplicate detection (see below): each client's normalized name, and an
+# inverted index of its trigrams with a count per trigram. Both are written
+# by the client mutations; a rename outside them clears name_norm, and
+# the maintenance job indexes every client left without one.
+def init_client_names(cur):
+    _ensure_column(cur, "clients", "name_norm", "TEXT")
+    _ensure_schema(
+        cur, "idx_clients_name_norm",
+        "CREATE INDEX idx_clients_name_norm ON clients (name_norm) WHERE deleted_at IS NULL",
+    )
+    _ensure_schema(
+        cur, "idx_clients_name_pending",
+        "CREATE INDEX idx_clients_name_pending ON clients (id) WHERE name_norm IS NULL",
+    )
+    _ensure_schema(
+        cur, "trg_clients_name_changed",
+        """
+        CREATE TRIGGER trg_clients_name_changed
+        AFTER UPDATE OF name ON clients
+        WHEN NEW.name IS NOT OLD.name
+        BEGIN
+            UPDATE clients SET name_norm = NULL WHERE id = NEW.id;
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS client_name_grams (
+            gram TEXT NOT NULL,
+            client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+            PRIMARY KEY (gram, client_id)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_client_name_grams_client ON client_name_grams (client_id);")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS client_name_gram_counts (
+            gram TEXT PRIMARY KEY,
+            n INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    _ensure_schema(
+        cur, "trg_client_name_grams_ins",
+        """
+        CREATE TRIGGER trg_client_name_grams_ins
+        AFTER INSERT ON client_name_grams
+        BEGIN
+            INSERT INTO client_name_gram_counts (gram, n) VALUES (NEW.gram, 1)
+            ON CONFLICT (gram) DO UPDATE SET n = n + 1;
+        END
+        """
+    )
+    _ensure_schema(
+        cur, "trg_client_name_grams_del",
+        """
+        CREATE TRIGGER trg_client_name_grams_del
+        AFTER DELETE ON client_name_grams
+        BEGIN
+            UPDATE client_name_gram_counts SET n = n - 1 WHERE gram = OLD.gram;
+        END
+        """
+    )
+
+
+def table_revisions():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT name, rev FROM table_revisions;")
+    return dict(cur.fetchall())
+
+
+# ------- Generated statements -------
+# Column lists and SQL text come from the registry in models.py and are
+# built once; the parameter tuples are produced by one compiled function.
+CLIENT_COLUMNS = tuple(c.name for c in CLIENT_FIELDS)
+LOG_COLUMNS = tuple(c.name for c in LOG_FIELDS if c.name != "client_id")
+MODULE_COLUMNS = tuple(c.name for c in MODULE_FIELDS if c.name != "client_id")
+KINDS = {c.name: c.kind for c in (*CLIENT_FIELDS, *LOG_FIELDS, *MODULE_FIELDS)}
+
+
+def _insert_sql(table: str, columns):
+    names = ", ".join(c.name for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table} ({names}) VALUES ({marks});"
+
+
+CLIENT_INSERT_SQL = _insert_sql("clients", CLIENT_FIELDS)
+LOG_INSERT_SQL = _insert_sql("client_logs", LOG_FIELDS)
+MODULE_INSERT_SQL = _insert_sql("client_modules", MODULE_FIELDS)
+_client_params = params_builder(CLIENT_FIELDS, required=("name",))
+_log_params = params_builder(LOG_FIELDS, required=("client_id", "title"))
+_module_params = params_builder(MODULE_FIELDS, required=("client_id", "module_id"))
+
+
+# One UPDATE text per (table, column subset), so repeated edits of the
+# same fields reuse the prepared statement
+@functools.lru_cache(maxsize=None)
+def _update_sql(table: str, cols: tuple):
+    assignments = "".join(f"{c}=?, " for c in cols)
+    live = " AND deleted_at IS NULL" if table in SOFT_DELETE_TABLES else ""
+    return (
+        f"UPDATE {table} SET {assignments}version=version + 1 "
+        f"WHERE id=? AND version=COALESCE(?, version){live};"
+    )
+
+
+# ------- Projections -------
+# List reads can ask for a subset of a model's fields (the others keep
+# their defaults), so pages only read and decode what they display.
+# id and version are always read.
+CLIENT_NAMES = ("name",)
+CLIENT_LIST = ("name", "code", "state", "status")
+LOG_SUMMARY = ("client_id", "log_date", "title", "status")
+LOG_LIST = ("client_id", "log_date", "title", "status", "owner", "remarks")
+
+# Fields that are not a plain column of the model's own table
+_SELECT_EXPRS = {Module: {"module_name": "m.name AS module_name"}}
+_TABLE_ALIAS = {Module: "cm."}
+
+
+# Select list in model field order, so any ordering of the same fields
+# gives the same statement text
+@functools.lru_cache(maxsize=None)
+def _select_list(model, columns=None):
+    known = MODEL_COLUMNS[model]
+    if columns is None:
+        names = list(known)
+    else:
+        unknown = [c for c in columns if c not in known]
+        if unknown:
+            raise ValueError(f"Unknown {model.__name__} field(s): {', '.join(unknown)}")
+        names = ["id", *(n for n in known if n in columns and n not in ("id", "version")), "version"]
+    exprs = _SELECT_EXPRS.get(model, {})
+    alias = _TABLE_ALIAS.get(model, "")
+    return ", ".join(exprs.get(n, alias + n) for n in names)
+
+
+def _columns(columns):
+    return None if columns is None else tuple(columns)
+
+
+# Process-wide write counters, shown on the Settings page
+STATS = Counter()
+
+
+def _db_value(v):
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+# Fields of `data` whose value differs from the loaded row
+def changed_fields(row, data: dict):
+    return {
+        k: v for k, v in data.items()
+        if _db_value(v) != _db_value(getattr(row, k))
+    }
+
+
+def _skipped_write():
+    STATS["writes_skipped"] += 1
+    fut = Future()
+    fut.set_result(True)
+    return fut
+
+
+def _update_row(cur, table: str, columns, row_id: int, data: dict, version=None):
+    cols = tuple(c for c in columns if c in data)
+    cur.execute(
+        _update_sql(table, cols),
+        (*(TO_DB[KINDS[c]](data[c]) for c in cols), row_id, version),
+    )
+    STATS["rows_updated"] += cur.rowcount
+    STATS["columns_written"] += len(cols) * cur.rowcount
+    return cur.rowcount == 1
+
+
+_write_update = mutation(_update_row)
+
+
+# ------- Clients -------
+def get_all_clients(limit=None, offset=0, columns=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {_select_list(Client, _columns(columns))} FROM clients "
+        "WHERE deleted_at IS NULL ORDER BY name COLLATE NOCASE LIMIT ? OFFSET ?;",
+        (-1 if limit is None else limit, offset),
+    )
+    return load_rows(Client, cur)
+
+
+def get_client_by_id(cid: int):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM clients WHERE id = ? AND deleted_at IS NULL;", (cid,))
+    return load_row(Client, cur)
+
+
+@mutation
+def create_client(cur, data: dict):
+    cur.execute(CLIENT_INSERT_SQL, _client_params(data))
+    cid = cur.lastrowid
+    _index_names(cur, [(cid, data["name"])])
+    return cid
+
+
+@mutation
+def create_clients(cur, items: list):
+    ids = []
+    for data in items:
+        cur.execute(CLIENT_INSERT_SQL, _client_params(data))
+        ids.append(cur.lastrowid)
+    _index_names(cur, [(cid, data["name"]) for cid, data in zip(ids, items)])
+    return ids
+
+
+# Updates only write the columns present in `data` (callers pass the
+# dirty fields from changed_fields) and bump the row version. With
+# `version` given they only apply if the row is still at that version;
+# the future resolves to False on a conflict (or if the row is gone).
+def update_client(cid: int, data: dict, version=None):
+    if not data:
+        return _skipped_write()
+    return _write_client_update(cid, data, version)
+
+
+@mutation
+def _write_client_update(cur, cid: int, data: dict, version=None):
+    updated = _update_row(cur, "clients", CLIENT_COLUMNS, cid, data, version)
+    if updated and "name" in data:
+        _index_names(cur, [(cid, data["name"])])
+    return updated
+
+
+# All mask values with every `require` flag set and every `exclude` flag clear.
+# Filtering with `integration_mask IN (...)` turns into index seeks.
+def integration_masks(require=(), exclude=()):
+    bits = {col: 1 << i for i, (col, _) in enumerate(INTEGRATION_FLAGS)}
+    need = sum(bits[c] for c in require)
+    deny = sum(bits[c] for c in exclude)
+    return [m for m in range(1 << len(INTEGRATION_FLAGS))
+            if m & need == need and not m & deny]
+
+
+def get_clients_by_integrations(require=(), exclude=(), statuses=()):
+    masks = integration_masks(require, exclude)
+    if not masks:
+        return []
+    conn = get_connection()
+    cur = conn.cursor()
+    query = (
+        "SELECT id, name, code, state, status, integration_mask FROM clients "
+        f"WHERE integration_mask IN ({', '.join('?' * len(masks))}) AND deleted_at IS NULL"
+    )
+    params = list(masks)
+    if statuses:
+        query += f" AND status IN ({', '.join('?' * len(statuses))})"
+        params.extend(statuses)
+    query += " ORDER BY name COLLATE NOCASE;"
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+def integration_mask_counts(statuses=()):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = "SELECT integration_mask, COUNT(*) AS clients FROM clients WHERE deleted_at IS NULL"
+    params = ()
+    if statuses:
+        query += f" AND status IN ({', '.join('?' * len(statuses))})"
+        params = tuple(statuses)
+    query += " GROUP BY integration_mask;"
+    cur.execute(query, params)
+    return cur.fetchall()
+
+
+# Deletes only tombstone the row (its logs and modules are hidden with
+# it); purge_deleted removes it for good once the undo window has passed
+@mutation
+def delete_client(cur, cid: int):
+    cur.execute(
+        "UPDATE clients SET deleted_at = datetime('now'), version = version + 1 "
+        "WHERE id=? AND deleted_at IS NULL;",
+        (cid,),
+    )
+
+
+@mutation
+def restore_client(cur, cid: int):
+    cur.execute(
+        "UPDATE clients SET deleted_at = NULL, version = version + 1 "
+        "WHERE id=? AND deleted_at IS NOT NULL;",
+        (cid,),
+    )
+    return cur.rowcount == 1
+
+
+# ------- Modules -------
+def get_modules_for_client(cid: int, columns=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT {_select_list(Module, _columns(columns))}
+        FROM client_modules cm
+        JOIN modules m ON m.id = cm.module_id
+        WHERE cm.client_id = ?
+        ORDER BY m.name;
+        """,
+        (cid,),
+    )
+    return load_rows(Module, cur)
+
+
+def _module_id(cur, name: str):
+    name = name.strip()
+    cur.execute("INSERT OR IGNORE INTO modules (name) VALUES (?);", (name,))
+    cur.execute("SELECT id FROM modules WHERE name = ? COLLATE NOCASE;", (name,))
+    return cur.fetchone()[0]
+
+
+@mutation
+def create_module(cur, cid: int, name: str, custom: str, is_live: bool):
+    cur.execute(MODULE_INSERT_SQL, _module_params({
+        "client_id": cid, "module_id": _module_id(cur, name),
+        "customizations": custom, "is_live": is_live,
+    }))
+    return cur.lastrowid
+
+def update_module(mid: int, data: dict, version=None):
+    if not data:
+        return _skipped_write()
+    return _update_module(mid, data, version)
+
+
+@mutation
+def _update_module(cur, mid: int, data: dict, version=None):
+    data = dict(data)
+    if "module_name" in data:
+        data["module_id"] = _module_id(cur, data.pop("module_name"))
+    return _update_row(cur, "client_modules", MODULE_COLUMNS, mid, data, version)
+
+
+@mutation
+def delete_module(cur, mid: int):
+    cur.execute("DELETE FROM client_modules WHERE id=?;", (mid,))
+
+
+def module_adoption():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT m.id, m.name,
+               COUNT(*) AS clients,
+               SUM(cm.is_live != 0) AS live_clients
+        FROM client_modules cm
+        JOIN modules m ON m.id = cm.module_id
+        WHERE cm.client_id NOT IN {DELETED_CLIENTS}
+        GROUP BY m.id
+        ORDER BY clients DESC, m.name;
+        """
+    )
+    return cur.fetchall()
+
+
+def get_clients_with_module(module_id: int, live_only=False):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = """
+        SELECT c.id, c.name, c.code, c.state, c.status, cm.is_live
+        FROM client_modules cm
+        JOIN clients c ON c.id = cm.client_id
+        WHERE cm.module_id = ? AND c.deleted_at IS NULL
+    """
+    if live_only:
+        query += " AND cm.is_live = 1"
+    query += " ORDER BY c.name COLLATE NOCASE;"
+    cur.execute(query, (module_id,))
+    return cur.fetchall()
+
+
+# ------- Logs -------
+def get_all_logs(status_filter="All", client_id=None, limit=None, offset=0, columns=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = f"SELECT {_select_list(Log, _columns(columns))} FROM client_logs"
+    cond = ["deleted_at IS NULL", f"client_id NOT IN {DELETED_CLIENTS}"]
+    params = []
+
+    if status_filter != "All":
+        cond.append("status = ?")
+        params.append(status_filter)
+    if client_id is not None:
+        cond.append("client_id = ?")
+        params.append(client_id)
+
+    query += " WHERE " + " AND ".join(cond)
+    query += " ORDER BY log_date DESC, id DESC LIMIT ? OFFSET ?;"
+    params += [-1 if limit is None else limit, offset]
+
+    cur.execute(query, tuple(params))
+    return load_rows(Log, cur)
+
+
+def get_logs_for_client(cid: int, columns=None):
+    return get_all_logs(client_id=cid, columns=columns)
+
+
+def get_log_by_id(lid: int):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM client_logs WHERE id=? AND deleted_at IS NULL;", (lid,))
+    return load_row(Log, cur)
+
+
+# "#123" / "123" looks up one log by id, anything else is a title prefix.
+# Both are index seeks, so the cost does not grow with the number of logs.
+def find_logs(term: str, limit=20, columns=None):
+    term = term.strip()
+    if not term:
+        return []
+    conn = get_connection()
+    cur = conn.cursor()
+    select = _select_list(Log, _columns(columns))
+    live = f"deleted_at IS NULL AND client_id NOT IN {DELETED_CLIENTS}"
+    if term.lstrip("#").isdigit():
+        cur.execute(f"SELECT {select} FROM client_logs WHERE id = ? AND {live};", (int(term.lstrip("#")),))
+    else:
+        prefix = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        cur.execute(
+            f"""
+            SELECT {select} FROM client_logs
+            WHERE title LIKE ? ESCAPE '\\' AND {live}
+            ORDER BY title COLLATE NOCASE, id DESC
+            LIMIT ?;
+            """,
+            (prefix, limit),
+        )
+    return load_rows(Log, cur)
+
+
+@mutation
+def create_log(cur, data: dict):
+    cur.execute(LOG_INSERT_SQL, _log_params(data))
+    return cur.lastrowid
+
+
+# Bulk inserts: all rows in one transaction, new ids in input order
+@mutation
+def create_logs(cur, items: list):
+    ids = []
+    for data in items:
+        cur.execute(LOG_INSERT_SQL, _log_params(data))
+        ids.append(cur.lastrowid)
+    return ids
+
+
+def update_log(lid: int, data: dict, version=None):
+    if not data:
+        return _skipped_write()
+    return _write_update("client_logs", LOG_COLUMNS, lid, data, version)
+
+
+@mutation
+def delete_log(cur, lid: int):
+    cur.execute(
+        "UPDATE client_logs SET deleted_at = datetime('now'), version = version + 1 "
+        "WHERE id=? AND deleted_at IS NULL;",
+        (lid,),
+    )
+
+
+@mutation
+def restore_log(cur, lid: int):
+    cur.execute(
+        "UPDATE client_logs SET deleted_at = NULL, version = version + 1 "
+        "WHERE id=? AND deleted_at IS NOT NULL;",
+        (lid,),
+    )
+    return cur.rowcount == 1
+
+
+# ------- Tombstones -------
+# Deleted clients and logs that can still be restored, newest first
+def get_deleted():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT 'client' AS kind, id, name AS label, NULL AS client_name, deleted_at
+        FROM clients WHERE deleted_at IS NOT NULL
+        UNION ALL
+        SELECT 'log', l.id, l.title, c.name, l.deleted_at
+        FROM client_logs l JOIN clients c ON c.id = l.client_id
+        WHERE l.deleted_at IS NOT NULL
+        ORDER BY deleted_at DESC;
+        """
+    )
+    return cur.fetchall()
+
+
+def _purge_batches(conn, sql: str, params: tuple, batch: int, pause: float):
+    removed = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            n = conn.execute(sql, (*params, batch)).rowcount
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        removed += n
+        if n < batch:
+            return removed
+        time.sleep(pause)  # let queued writers in between batches
+
+
+# Hard-delete tombstones older than the undo window. Each batch is its own
+# short transaction, so the write lock is never held for long. Needs an
+# autocommit connection (see maintenance.py); returns rows removed per table.
+def purge_deleted(conn, older_than_days=UNDO_WINDOW_DAYS, batch=PURGE_BATCH, pause=0.01):
+    cutoff = (f"-{older_than_days} days",)
+    removed = Counter()
+    removed["client_logs"] += _purge_batches(
+        conn,
+        "DELETE FROM client_logs WHERE id IN ("
+        "SELECT id FROM client_logs WHERE deleted_at < datetime('now', ?) LIMIT ?);",
+        cutoff, batch, pause,
+    )
+    expired = conn.execute(
+        "SELECT id FROM clients WHERE deleted_at < datetime('now', ?);", cutoff
+    ).fetchall()
+    for (cid,) in expired:
+        # Children first, so the final client delete has nothing to cascade
+        for table in ("client_logs", "client_modules"):
+            removed[table] += _purge_batches(
+                conn,
+                f"DELETE FROM {table} WHERE id IN ("
+                f"SELECT id FROM {table} WHERE client_id = ? LIMIT ?);",
+                (cid,), batch, pause,
+            )
+        removed["clients"] += _purge_batches(
+            conn,
+            "DELETE FROM clients WHERE id IN (SELECT id FROM clients WHERE id = ? LIMIT ?);",
+            (cid,), batch, pause,
+        )
+    return removed
+
+
+# ------- Long text compression -------
+LONGTEXT_COLUMNS = {
+    table: tuple(c.name for c in fields if c.kind == "longtext")
+    for table, fields in (
+        ("clients", CLIENT_FIELDS), ("client_logs", LOG_FIELDS), ("client_modules", MODULE_FIELDS),
+    )
+}
+
+
+# Compress long text stored before compression existed (or while it was
+# off). Walks each table by id in short transactions like the purger;
+# versions are left alone since the text itself does not change. Needs an
+# autocommit connection; returns rows rewritten per table.
+def compress_longtext(conn, batch=PURGE_BATCH, pause=0.01):
+    packed = Counter()
+    if models.COMPRESS_MIN_BYTES is None:
+        return packed
+    for table, cols in LONGTEXT_COLUMNS.items():
+        long_text = " OR ".join(
+            f"(typeof({c}) = 'text' AND length(CAST({c} AS BLOB)) >= {models.COMPRESS_MIN_BYTES})"
+            for c in cols
+        )
+        last = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {', '.join(cols)} FROM {table} WHERE id > ? AND ({long_text}) "
+                "ORDER BY id LIMIT ?;",
+                (last, batch),
+            ).fetchall()
+            if not rows:
+                break
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                for row in rows:
+                    values = [_pack(v) for v in row[1:]]
+                    if any(isinstance(v, bytes) for v in values):
+                        conn.execute(
+                            f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in cols)} WHERE id = ?;",
+                            (*values, row[0]),
+                        )
+                        packed[table] += 1
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+            last = rows[-1][0]
+            time.sleep(pause)
+    return packed
+
+
+# ------- SLA -------
+# Incremental: each scan reads only the logs whose updated_at is past the
+# checkpoint kept in meta, walking (updated_at, id) in short transactions
+# like the purger, and moves them into or out of log_sla. Time passing
+# needs no rescan: the overdue check is a range read on log_sla.since.
+# A log keeps its `since` while it stays in the same status. Needs an
+# autocommit connection (see maintenance.py); returns logs scanned.
+def sla_scan(conn, batch=SLA_BATCH, pause=0.01):
+    mark = conn.execute("SELECT value FROM meta WHERE key = 'sla.checkpoint';").fetchone()
+    start = ""
+    if mark:
+        start = (datetime.fromisoformat(mark[0]) - timedelta(seconds=SLA_OVERLAP)).strftime("%Y-%m-%d %H:%M:%S")
+    after = (start, 0)
+    scanned = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, client_id, status, updated_at, deleted_at FROM client_logs "
+            "WHERE (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?;",
+            (*after, batch),
+        ).fetchall()
+        if not rows:
+            return scanned
+        tracked = [
+            (r[0], r[1], r[2], r[3]) for r in rows if r[4] is None and r[2] in SLA_DAYS
+        ]
+        dropped = [(r[0],) for r in rows if r[4] is not None or r[2] not in SLA_DAYS]
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            conn.executemany(
+                "INSERT INTO log_sla (log_id, client_id, status, since) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (log_id) DO UPDATE SET client_id = excluded.client_id, "
+                "since = CASE WHEN log_sla.status = excluded.status THEN log_sla.since "
+                "ELSE excluded.since END, status = excluded.status;",
+                tracked,
+            )
+            conn.executemany("DELETE FROM log_sla WHERE log_id = ?;", dropped)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('sla.checkpoint', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+                (rows[-1][3],),
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        scanned += len(rows)
+        if len(rows) < batch:
+            return scanned
+        after = (rows[-1][3], rows[-1][0])
+        time.sleep(pause)  # let queued writers in between batches
+
+
+# Logs past their status's SLA, longest waiting first. A log whose status
+# changed since the last scan is left out until the scan catches up.
+def overdue_logs(client_id=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    late = " OR ".join("(s.status = ? AND s.since < datetime('now', ?))" for _ in SLA_DAYS)
+    params = [p for status, days in SLA_DAYS.items() for p in (status, f"-{days} days")]
+    query = f"""
+        SELECT s.log_id AS id, s.client_id, c.name AS client_name, l.title, l.owner,
+               s.status, s.since
+        FROM log_sla s
+        JOIN client_logs l ON l.id = s.log_id
+        JOIN clients c ON c.id = s.client_id
+        WHERE ({late or "1 = 0"}) AND l.status = s.status
+          AND l.deleted_at IS NULL AND c.deleted_at IS NULL
+    """
+    if client_id is not None:
+        query += " AND s.client_id = ?"
+        params.append(client_id)
+    cur.execute(query + " ORDER BY s.since;", tuple(params))
+    return cur.fetchall()
+
+
+# ------- Status history -------
+# Seed history for logs that predate it: one row per log with its current
+# status as of its last change. Streams through client_logs by id in short
+# transactions like the purger, resuming from the id kept in meta; logs
+# that already have history (new ones, or changed since) are skipped.
+# Needs an autocommit connection (see maintenance.py); returns rows seeded.
+def backfill_status_history(conn, batch=PURGE_BATCH, pause=0.01):
+    if history_backfilled(conn):
+        return 0
+    mark = conn.execute("SELECT value FROM meta WHERE key = 'history.backfill';").fetchone()
+    after = int(mark[0]) if mark else 0
+    seeded = 0
+    while True:
+        ids = conn.execute(
+            "SELECT id FROM client_logs WHERE id > ? ORDER BY id LIMIT ?;", (after, batch)
+        ).fetchall()
+        last = ids[-1][0] if ids else after
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            seeded += conn.execute(
+                """
+                INSERT INTO log_status_history (log_id, status, changed_at)
+                SELECT id, COALESCE(status, ''), COALESCE(updated_at, datetime(log_date), datetime('now'))
+                FROM client_logs l
+                WHERE id > ? AND id <= ?
+                  AND NOT EXISTS (SELECT 1 FROM log_status_history h WHERE h.log_id = l.id);
+                """,
+                (after, last),
+            ).rowcount
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('history.backfill', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+                ("done" if len(ids) < batch else str(last),),
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        if len(ids) < batch:
+            return seeded
+        after = last
+        time.sleep(pause)  # let queued writers in between batches
+
+
+def history_backfilled(conn):
+    mark = conn.execute("SELECT value FROM meta WHERE key = 'history.backfill';").fetchone()
+    return bool(mark) and mark[0] == "done"
+
+
+# Average days logs stayed in each status, over stays that ended since
+# `since`. LEAD gives each history row the time the log left that status
+# (NULL while it is still there).
+def time_in_status(since: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        WITH spans AS (
+            SELECT h.log_id, h.status, h.changed_at,
+                   LEAD(h.changed_at) OVER (PARTITION BY h.log_id ORDER BY h.changed_at, h.id) AS left_at
+            FROM log_status_history h
+            WHERE h.log_id IN (SELECT log_id FROM log_status_history WHERE changed_at >= ?)
+        )
+        SELECT s.status, COUNT(*) AS stays,
+               AVG(julianday(s.left_at) - julianday(s.changed_at)) AS avg_days,
+               MAX(julianday(s.left_at) - julianday(s.changed_at)) AS max_days
+        FROM spans s
+        JOIN client_logs l ON l.id = s.log_id
+        WHERE s.left_at >= ? AND l.deleted_at IS NULL AND l.client_id NOT IN {DELETED_CLIENTS}
+        GROUP BY s.status
+        ORDER BY avg_days DESC;
+        """,
+        (since, since),
+    )
+    return cur.fetchall()
+
+
+# Per week of first completion: lead time runs from the log date, cycle time
+# from the first move to In Progress before completing
+def cycle_lead_time_per_week(since: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        WITH marks AS (
+            SELECT h.log_id, h.status, h.changed_at,
+                   MIN(CASE WHEN h.status = 'In Progress' THEN h.changed_at END) OVER w AS started_at,
+                   ROW_NUMBER() OVER (PARTITION BY h.log_id, h.status ORDER BY h.changed_at, h.id) AS nth
+            FROM log_status_history h
+            WHERE h.log_id IN (
+                SELECT log_id FROM log_status_history WHERE status = 'Completed' AND changed_at >= ?
+            )
+            WINDOW w AS (PARTITION BY h.log_id ORDER BY h.changed_at, h.id)
+        )
+        SELECT strftime('%Y-W%W', m.changed_at) AS week,
+               COUNT(*) AS completed,
+               AVG(julianday(m.changed_at) - julianday(l.log_date)) AS lead_days,
+               AVG(julianday(m.changed_at) - julianday(m.started_at)) AS cycle_days
+        FROM marks m
+        JOIN client_logs l ON l.id = m.log_id
+        WHERE m.status = 'Completed' AND m.nth = 1 AND m.changed_at >= ?
+          AND l.deleted_at IS NULL AND l.client_id NOT IN {DELETED_CLIENTS}
+        GROUP BY strftime('%Y-W%W', m.changed_at)
+        ORDER BY week;
+        """,
+        (since, since),
+    )
+    return cur.fetchall()
+
+
+# ------- Duplicate detection -------
+# Exact duplicates share a normalized name (case, punctuation and legal
+# suffixes ignored: "ACME PVT. LTD." and "Acme Pvt Ltd" are both "acme").
+# Fuzzy candidates come from the trigram index: only the query's rarest
+# trigrams are looked up, within a budget of index entries, so a lookup
+# stays a few small range reads however many clients there are. The
+# candidates are then scored by trigram similarity (Jaccard) in Python.
+LEGAL_SUFFIXES = {
+    "pvt", "private", "ltd", "limited", "llp", "llc", "inc", "incorporated",
+    "corp", "corporation", "co", "company", "plc", "gmbh",
+}
+DEDUPE_MIN_SIMILARITY = 0.5
+DEDUPE_MAX_POSTINGS = 5000  # trigram index entries read per lookup
+DEDUPE_CANDIDATES = 200  # clients scored per lookup
+_NAME_DROP = re.compile(r"[.'’]")
+_NAME_SPLIT = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str):
+    words = [w for w in _NAME_SPLIT.split(_NAME_DROP.sub("", (name or "").casefold())) if w]
+    stem = list(words)
+    while stem and stem[-1] in LEGAL_SUFFIXES:
+        stem.pop()
+    return " ".join(stem or words)
+
+
+def name_grams(norm: str):
+    padded = f" {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a: set, b: set):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+# (id, name) pairs -> name_norm and trigram rows, inside the caller's transaction
+def _index_names(cur, pairs):
+    rows = [(normalize_name(name), cid) for cid, name in pairs]
+    cur.executemany("UPDATE clients SET name_norm = ? WHERE id = ?;", rows)
+    cur.executemany("DELETE FROM client_name_grams WHERE client_id = ?;", [(cid,) for _, cid in rows])
+    cur.executemany(
+        "INSERT INTO client_name_grams (gram, client_id) VALUES (?, ?);",
+        [(gram, cid) for norm, cid in rows for gram in sorted(name_grams(norm))],
+    )
+
+
+def names_pending(conn):
+    return conn.execute("SELECT 1 FROM clients WHERE name_norm IS NULL LIMIT 1;").fetchone() is not None
+
+
+# Index clients left without a normalized name (those predating the index,
+# renamed outside the client mutations, or bulk loaded with plain SQL) in
+# short transactions like the purger. Needs an autocommit connection (see
+# maintenance.py); returns clients indexed.
+def index_client_names(conn, batch=PURGE_BATCH, pause=0.01):
+    indexed = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, name FROM clients WHERE name_norm IS NULL ORDER BY id LIMIT ?;", (batch,)
+        ).fetchall()
+        if not rows:
+            return indexed
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            _index_names(conn, [(r[0], r[1]) for r in rows])
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        indexed += len(rows)
+        if len(rows) < batch:
+            return indexed
+        time.sleep(pause)  # let queued writers in between batches
+
+
+# Live clients whose names look like `name`, best match first, as dicts
+# with a "score" from 0 to 1 (1 for the same normalized name)
+def find_duplicate_clients(name: str, exclude_id=None, limit=5, min_score=DEDUPE_MIN_SIMILARITY):
+    norm = normalize_name(name)
+    if not norm:
+        return []
+    grams = name_grams(norm)
+    conn = get_connection()
+    cur = conn.cursor()
+
+    marks = ", ".join("?" for _ in grams)
+    cur.execute(f"SELECT gram, n FROM client_name_gram_counts WHERE gram IN ({marks}) AND n > 0;", tuple(grams))
+    probe, budget = [], DEDUPE_MAX_POSTINGS
+    for gram, n in sorted(cur.fetchall(), key=lambda r: r[1]):
+        if probe and n > budget:
+            break
+        probe.append(gram)
+        budget -= n
+
+    ids = set()
+    if probe:
+        marks = ", ".join("?" for _ in probe)
+        cur.execute(
+            f"SELECT client_id FROM client_name_grams WHERE gram IN ({marks}) "
+            "GROUP BY client_id ORDER BY COUNT(*) DESC LIMIT ?;",
+            (*probe, DEDUPE_CANDIDATES),
+        )
+        ids = {r[0] for r in cur.fetchall()}
+    cur.execute(
+        "SELECT id FROM clients WHERE name_norm = ? AND deleted_at IS NULL LIMIT ?;",
+        (norm, DEDUPE_CANDIDATES),
+    )
+    ids.update(r[0] for r in cur.fetchall())
+    ids.discard(exclude_id)
+    if not ids:
+        return []
+
+    marks = ", ".join("?" for _ in ids)
+    cur.execute(
+        f"SELECT id, name, name_norm, code, state, status FROM clients "
+        f"WHERE id IN ({marks}) AND deleted_at IS NULL;",
+        tuple(ids),
+    )
+    matches = []
+    for r in cur.fetchall():
+        score = 1.0 if r[2] == norm else _similarity(grams, name_grams(r[2] or normalize_name(r[1])))
+        if score >= min_score:
+            matches.append({
+                "id": r[0], "name": r[1], "code": r[3], "state": r[4], "status": r[5],
+                "score": round(score, 2),
+            })
+    matches.sort(key=lambda m: (-m["score"], m["name"].casefold()))
+    return matches[:limit]
+
+
+# Live clients with the same normalized name as `name`, oldest first
+def clients_named(name: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, name FROM clients WHERE name_norm = ? AND deleted_at IS NULL ORDER BY id;",
+        (normalize_name(name),),
+    )
+    return cur.fetchall()
+
+
+# Groups of live clients sharing a normalized name, oldest client first
+def exact_duplicate_groups():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT c.name_norm, c.id, c.name
+        FROM clients c
+        JOIN (
+            SELECT name_norm FROM clients
+            WHERE deleted_at IS NULL AND name_norm IS NOT NULL
+            GROUP BY name_norm HAVING COUNT(*) > 1
+        ) d ON d.name_norm = c.name_norm
+        WHERE c.deleted_at IS NULL
+        ORDER BY c.name_norm, c.id;
+        """
+    )
+    groups = {}
+    for norm, cid, name in cur.fetchall():
+        groups.setdefault(norm, []).append((cid, name))
+    return list(groups.values())
+
+
+# Fold `drop` clients into `keep`: their logs move over, modules keep has
+# not got are moved, empty fields on keep are filled from them, and they
+# are soft-deleted (restorable for the undo window like any delete).
+# Returns {"logs": n, "modules": n, "clients": n}.
+@mutation
+def merge_clients(cur, keep: int, drop: list):
+    moved = Counter()
+    cur.execute("SELECT * FROM clients WHERE id = ? AND deleted_at IS NULL;", (keep,))
+    target = load_row(Client, cur)
+    if target is None:
+        raise ValueError(f"client {keep} not found")
+    fill = {}
+    for cid in drop:
+        if cid == keep:
+            continue
+        cur.execute("SELECT * FROM clients WHERE id = ? AND deleted_at IS NULL;", (cid,))
+        source = load_row(Client, cur)
+        if source is None:
+            continue
+        for c in CLIENT_COLUMNS:
+            if getattr(target, c) in (None, "") and getattr(source, c) not in (None, "") and c not in fill:
+                fill[c] = getattr(source, c)
+        cur.execute(
+            "UPDATE client_logs SET client_id = ?, version = version + 1 WHERE client_id = ?;",
+            (keep, cid),
+        )
+        moved["logs"] += cur.rowcount
+        cur.execute(
+            "UPDATE client_modules SET client_id = ?, version = version + 1 "
+            "WHERE client_id = ? AND module_id NOT IN "
+            "(SELECT module_id FROM client_modules WHERE client_id = ?);",
+            (keep, cid, keep),
+        )
+        moved["modules"] += cur.rowcount
+        cur.execute(
+            "UPDATE clients SET deleted_at = datetime('now'), version = version + 1 "
+            "WHERE id = ? AND deleted_at IS NULL;",
+            (cid,),
+        )
+        moved["clients"] += cur.rowcount
+    if fill:
+        _update_row(cur, "clients", CLIENT_COLUMNS, keep, fill)
+    return dict(moved)
+
+
+# ------- Reports -------
+# group_by: None (per owner), "client" (owner x client) or "week" (owner x week)
+def owner_workload(group_by=None):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    extra_cols = ""
+    group = "l.owner"
+    join = ""
+    if group_by == "client":
+        extra_cols = ", l.client_id, c.name AS client_name"
+        group = "l.owner, l.client_id, c.name"
+        join = "LEFT JOIN clients c ON c.id = l.client_id"
+    elif group_by == "week":
+        extra_cols = ", strftime('%Y-W%W', l.log_date) AS week"
+        group = "l.owner, week"
+
+    cur.execute(
+        f"""
+        SELECT COALESCE(l.owner, 'Unassigned') AS owner{extra_cols},
+               SUM(CASE WHEN l.status = 'Blocked'
+                         OR lower(l.status) IN ('completed', 'done', 'closed')
+                        THEN 0 ELSE 1 END) AS open_count,
+               SUM(l.status = 'Blocked') AS blocked_count,
+               SUM(lower(l.status) IN ('completed', 'done', 'closed')) AS completed_count,
+               COUNT(*) AS total_count
+        FROM client_logs l
+        {join}
+        WHERE l.deleted_at IS NULL AND l.client_id NOT IN {DELETED_CLIENTS}
+        GROUP BY {group}
+        ORDER BY open_count DESC, blocked_count DESC, owner COLLATE NOCASE;
+        """
+    )
+    return cur.fetchall()
+
+
+# ------- Analytics (served from rollup tables) -------
+# Logs of tombstoned clients stay in the rollups until they are purged,
+# so the reports filter those clients out
+def logs_per_week(since: str, client_id=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = f"""
+        SELECT bucket AS week, status, SUM(n) AS logs
+        FROM log_rollup_weekly
+        WHERE bucket >= ? AND n > 0 AND client_id NOT IN {DELETED_CLIENTS}
+    """
+    params = [since]
+    if client_id is not None:
+        query += " AND client_id = ?"
+        params.append(client_id)
+    query += " GROUP BY bucket, status ORDER BY bucket;"
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+def logs_per_day(since: str, client_id=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = f"""
+        SELECT bucket AS day, SUM(n) AS logs
+        FROM log_rollup_daily
+        WHERE bucket >= ? AND n > 0 AND client_id NOT IN {DELETED_CLIENTS}
+    """
+    params = [since]
+    if client_id is not None:
+        query += " AND client_id = ?"
+        params.append(client_id)
+    query += " GROUP BY bucket ORDER BY bucket;"
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+def completion_time_per_week(since: str, client_id=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = f"""
+        SELECT bucket AS week,
+               SUM(completed) AS completed,
+               SUM(total_days) / NULLIF(SUM(timed), 0) AS avg_days
+        FROM log_completion_weekly
+        WHERE bucket >= ? AND completed > 0 AND client_id NOT IN {DELETED_CLIENTS}
+    """
+    params = [since]
+    if client_id is not None:
+        query += " AND client_id = ?"
+        params.append(client_id)
+    query += " GROUP BY bucket ORDER BY bucket;"
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+def golive_pipeline_by_month():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT bucket AS month, status, n AS clients
+        FROM client_golive_monthly
+        WHERE bucket != '' AND n > 0
+        ORDER BY bucket;
+        """
+    )
+    return cur.fetchall()
+
+
+# ------- Calendar -------
+# Date-range reads for the calendar page. Windows are half-open
+# [start, end) ISO dates, so consecutive months never overlap.
+MILESTONES = {"initial_training_date": "Training", "go_live_date": "Go-Live"}
+MILESTONE_INDEXES = {
+    "initial_training_date": "idx_clients_live_training",
+    "go_live_date": "idx_clients_live_golive",
+}
+
+
+def client_milestones(start: str, end: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    # One indexed range per kind; a client with both dates in the window
+    # appears twice
+    query = " UNION ALL ".join(
+        f"SELECT {column} AS day, '{kind}' AS kind, id AS client_id, name, status "
+        f"FROM clients WHERE deleted_at IS NULL AND {column} >= ? AND {column} < ?"
+        for column, kind in MILESTONES.items()
+    )
+    cur.execute(query + " ORDER BY day, name;", (start, end) * len(MILESTONES))
+    return cur.fetchall()
+
+
+def logs_per_month(start: str, end: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT substr(bucket, 1, 7) AS month, status, SUM(n) AS logs
+        FROM log_rollup_daily
+        WHERE bucket >= ? AND bucket < ? AND n > 0 AND client_id NOT IN {DELETED_CLIENTS}
+        GROUP BY substr(bucket, 1, 7), status
+        ORDER BY month;
+        """,
+        (start, end),
+    )
+    return cur.fetchall()
+
+
+# ------- Cross-workspace reports -------
+# Read-only: workspace files are attached with mode=ro to a scratch
+# in-memory connection, so a report never takes a lock a team's writer
+# would wait on. `select` is one SELECT with a {ws} schema placeholder;
+# it runs once per workspace and the results are concatenated.
+def _across_workspaces(select: str, names=None):
+    if BACKEND.name != "sqlite":
+        return get_connection().execute(
+            f"SELECT ? AS workspace, * FROM ({select.format(ws='public')}) AS w;", (DEFAULT_WORKSPACE,)
+        ).fetchall()
+    names = [n for n in (names or list_workspaces()) if os.path.exists(workspace_path(n))]
+    rows = []
+    for start in range(0, len(names), MAX_ATTACHED):
+        chunk = names[start:start + MAX_ATTACHED]
+        conn = sqlite3.connect(":memory:", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            for i, name in enumerate(chunk):
+                uri = pathlib.Path(workspace_path(name)).absolute().as_uri() + "?mode=ro"
+                conn.execute(f"ATTACH DATABASE ? AS ws{i};", (uri,))
+            query = " UNION ALL ".join(
+                f"SELECT ? AS workspace, * FROM ({select.format(ws=f'ws{i}')}) AS w"
+                for i in range(len(chunk))
+            )
+            rows += conn.execute(query, tuple(chunk)).fetchall()
+        finally:
+            conn.close()
+    return rows
+
+
+def workspace_summary(names=None):
+    return _across_workspaces(
+        """
+        SELECT
+            (SELECT COUNT(*) FROM {ws}.clients WHERE deleted_at IS NULL) AS clients,
+            COUNT(*) AS logs,
+            COALESCE(SUM(lower(COALESCE(l.status, '')) NOT IN ('completed', 'done', 'closed')), 0) AS open_logs,
+            COALESCE(SUM(l.status = 'Blocked'), 0) AS blocked_logs,
+            COALESCE(SUM(l.log_date >= date('now', '-30 days')), 0) AS logs_last_30_days
+        FROM {ws}.client_logs l
+        WHERE l.deleted_at IS NULL
+          AND l.client_id NOT IN (SELECT id FROM {ws}.clients WHERE deleted_at IS NOT NULL)
+        """,
+        names,
+    )
+
+
+def owner_workload_across_workspaces(names=None):
+    return _across_workspaces(
+        """
+        SELECT COALESCE(l.owner, 'Unassigned') AS owner,
+               SUM(CASE WHEN l.status = 'Blocked'
+                         OR lower(l.status) IN ('completed', 'done', 'closed')
+                        THEN 0 ELSE 1 END) AS open_count,
+               SUM(l.status = 'Blocked') AS blocked_count,
+               COUNT(*) AS total_count
+        FROM {ws}.client_logs l
+        WHERE l.deleted_at IS NULL
+          AND l.client_id NOT IN (SELECT id FROM {ws}.clients WHERE deleted_at IS NOT NULL)
+        GROUP BY l.owner
+        """,
+        names,
+    )
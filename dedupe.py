@@ -0,0 +1,84 @@
+# dedupe.py
+# Find and merge duplicate clients in existing data. Exact duplicates share
+# a normalized name (see db.normalize_name); --fuzzy also lists pairs the
+# trigram index scores as similar. Merging moves logs and modules onto the
+# kept client and soft-deletes the others, so a merge can be undone from
+# Settings within the undo window.
+# Usage: python dedupe.py [scan [--fuzzy] | merge KEEP DROP... | merge-exact [--dry-run]]
+import argparse
+
+import db
+from maintenance import _maint_connection
+
+
+def _index_pending():
+    conn = _maint_connection(db.current_path())
+    try:
+        return db.index_client_names(conn)
+    finally:
+        conn.close()
+
+
+# Similar pairs below the exact level, each pair once
+def fuzzy_pairs(min_score=db.DEDUPE_MIN_SIMILARITY):
+    pairs = []
+    for client in db.get_all_clients(columns=db.CLIENT_NAMES):
+        for m in db.find_duplicate_clients(client.name, exclude_id=client.id, min_score=min_score):
+            if m["score"] < 1 and m["id"] > client.id:
+                pairs.append((m["score"], (client.id, client.name), (m["id"], m["name"])))
+    return sorted(pairs, reverse=True)
+
+
+def _merge(keep: int, drop: list):
+    moved = db.merge_clients(keep, drop).result()
+    print(
+        f"Merged {moved.get('clients', 0)} client(s) into #{keep}: "
+        f"{moved.get('logs', 0)} log(s), {moved.get('modules', 0)} module(s) moved"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Find and merge duplicate clients.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("scan", help="list duplicate groups")
+    sp.add_argument("--fuzzy", action="store_true", help="also list similar names")
+    sp.add_argument("--min-score", type=float, default=db.DEDUPE_MIN_SIMILARITY)
+    mp = sub.add_parser("merge", help="merge clients into the one to keep")
+    mp.add_argument("keep", type=int)
+    mp.add_argument("drop", type=int, nargs="+")
+    ep = sub.add_parser("merge-exact", help="merge every exact group into its oldest client")
+    ep.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--db", default=db.DB_PATH, help="database file of the default workspace")
+    ap.add_argument("--workspace", default=db.DEFAULT_WORKSPACE)
+    args = ap.parse_args()
+    db.DB_PATH = args.db
+    db.set_workspace(args.workspace)
+    db.init_db()
+
+    indexed = _index_pending()
+    if indexed:
+        print(f"Indexed {indexed} client name(s)")
+
+    if args.cmd == "scan":
+        groups = db.exact_duplicate_groups()
+        for group in groups:
+            print("  ".join(f"#{cid} {name}" for cid, name in group))
+        print(f"{len(groups)} group(s) of exact duplicates")
+        if args.fuzzy:
+            pairs = fuzzy_pairs(args.min_score)
+            for score, (a, a_name), (b, b_name) in pairs:
+                print(f"{score:.2f}  #{a} {a_name}  ~  #{b} {b_name}")
+            print(f"{len(pairs)} similar pair(s)")
+    elif args.cmd == "merge":
+        _merge(args.keep, args.drop)
+    else:
+        for group in db.exact_duplicate_groups():
+            (keep, name), drop = group[0], [cid for cid, _ in group[1:]]
+            if args.dry_run:
+                print(f"Would merge {', '.join(f'#{cid}' for cid in drop)} into #{keep} {name}")
+            else:
+                _merge(keep, drop)
+
+
+if __name__ == "__main__":
+    main()
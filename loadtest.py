@@ -0,0 +1,210 @@
+# loadtest.py
+# Drives N concurrent simulated sessions against a seeded throwaway
+# database and reports throughput, latency percentiles and lock errors.
+# Sessions call the same db functions the pages call (or, with
+# --mode apptest, render whole pages through Streamlit's AppTest).
+# Usage: python loadtest.py --sessions 20 --duration 30
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+import bench
+import db
+
+PAGES = ["Dashboard", "Clients", "Logs / Tasks", "Workload", "Analytics",
+         "Calendar", "Integrations", "Modules", "Settings"]
+
+
+# ------- Session actions (one per user interaction) -------
+def dashboard(rnd):
+    clients = db.get_all_clients()
+    logs = db.get_all_logs()
+    return [l for l in logs if l.status != "Completed"], clients
+
+
+def search(rnd):
+    s = rnd.choice(["client 1", "c2", "progress", "completed", "9"])
+    return [c for c in db.get_all_clients()
+            if s in (c.name or "").lower() or s in (c.code or "").lower()
+            or s in (c.status or "").lower() or s in (c.state or "").lower()]
+
+
+def client_detail(rnd, n_clients):
+    cid = rnd.randint(1, n_clients)
+    return db.get_client_by_id(cid), db.get_logs_for_client(cid), db.get_modules_for_client(cid)
+
+
+def reports(rnd):
+    since = (date.today() - timedelta(weeks=26)).isoformat()
+    return db.owner_workload(rnd.choice([None, "client", "week"])), db.logs_per_week(since)
+
+
+def create_log(rnd, n_clients):
+    return db.create_log({
+        "client_id": rnd.randint(1, n_clients),
+        "log_date": date.today().isoformat(),
+        "title": f"Load test {rnd.random():.6f}",
+        "status": rnd.choice(bench.STATUSES),
+        "owner": f"owner{rnd.randint(1, 40)}",
+    }).result()
+
+
+# Returns False on a version conflict, like the edit dialog would see
+def edit_client(rnd, n_clients):
+    client = db.get_client_by_id(rnd.randint(1, n_clients))
+    if client is None:
+        return True
+    data = db.changed_fields(client, {"status": rnd.choice(["In Progress", "Completed", "On Hold"])})
+    if not data:
+        return True
+    return db.update_client(client.id, data, client.version).result()
+
+
+MIX = [  # (action, weight)
+    ("dashboard", 35),
+    ("search", 20),
+    ("client_detail", 15),
+    ("reports", 10),
+    ("create_log", 12),
+    ("edit_client", 8),
+]
+
+
+# ------- Runner -------
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.errors = Counter()
+        self.conflicts = 0
+
+    def record(self, action, seconds, error=None, conflict=False):
+        with self.lock:
+            if error is None:
+                self.latency[action].append(seconds)
+                self.conflicts += conflict
+            elif isinstance(error, sqlite3.OperationalError) and "locked" in str(error):
+                self.errors["database is locked"] += 1
+            else:
+                self.errors[f"{type(error).__name__}: {error}"] += 1
+
+
+def _call_session(i, args, stop, results):
+    rnd = random.Random(i)
+    names = [a for a, _ in MIX]
+    weights = [w for _, w in MIX]
+    while not stop.is_set():
+        action = rnd.choices(names, weights)[0]
+        fn = globals()[action]
+        t0 = time.perf_counter()
+        try:
+            with db.pooled() if args.pooled else nullcontext():
+                if action in ("client_detail", "create_log", "edit_client"):
+                    out = fn(rnd, args.clients)
+                else:
+                    out = fn(rnd)
+        except Exception as e:
+            results.record(action, 0, e)
+        else:
+            results.record(action, time.perf_counter() - t0, conflict=out is False)
+        time.sleep(args.think / 1000)
+
+
+def _apptest_session(i, args, stop, results):
+    from streamlit.testing.v1 import AppTest
+
+    rnd = random.Random(i)
+    at = AppTest.from_file(os.path.join(os.path.dirname(__file__), "app.py"), default_timeout=60)
+    rendered = False
+    while not stop.is_set():
+        page = rnd.choice(PAGES)
+        t0 = time.perf_counter()
+        try:
+            if rendered:
+                at.sidebar.radio[0].set_value(page)
+            else:
+                page = PAGES[0]  # the first run renders the default page
+            at.run()
+            rendered = True
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        except Exception as e:
+            results.record(page, 0, e)
+        else:
+            results.record(page, time.perf_counter() - t0)
+        time.sleep(args.think / 1000)
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] * 1000 if values else 0.0
+
+
+def report(results, elapsed):
+    total = sum(len(v) for v in results.latency.values())
+    print(f"\n{'action':<16} {'ops':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for action, values in sorted(results.latency.items()):
+        print(f"{action:<16} {len(values):>7} {_pct(values, .5):>9.1f} "
+              f"{_pct(values, .99):>9.1f} {max(values) * 1000:>9.1f}")
+    every = [v for values in results.latency.values() for v in values]
+    print(f"{'all':<16} {total:>7} {_pct(every, .5):>9.1f} {_pct(every, .99):>9.1f}")
+    print(f"\nthroughput       {total / elapsed:.1f} ops/s over {elapsed:.1f} s")
+    print(f"version conflicts {results.conflicts}")
+    print(f"database is locked {results.errors.pop('database is locked', 0)}")
+    for error, n in results.errors.most_common():
+        print(f"error            {n} x {error}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the tracker with concurrent sessions.")
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--duration", type=float, default=20, help="seconds")
+    ap.add_argument("--think", type=float, default=0, help="pause between actions, ms")
+    ap.add_argument("--mode", choices=["calls", "apptest"], default="calls")
+    ap.add_argument("--pooled", action="store_true",
+                    help="give every action its own pooled connection instead of the shared one")
+    ap.add_argument("--async-writes", action="store_true", help="route writes through the write queue")
+    ap.add_argument("--db", help="existing database to copy (default: a seeded one)")
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--logs", type=int, default=20_000)
+    args = ap.parse_args()
+
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    db.ASYNC_WRITES = args.async_writes
+    if args.db:
+        src = sqlite3.connect(args.db)
+        src.backup(sqlite3.connect(db.DB_PATH))
+        src.close()
+        db.init_db()
+        args.clients = db.get_connection().execute("SELECT MAX(id) FROM clients;").fetchone()[0] or 1
+    else:
+        db.init_db()
+        bench.seed(args.clients, args.logs)
+
+    target = _apptest_session if args.mode == "apptest" else _call_session
+    results = Results()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=target, args=(i, args, stop, results), daemon=True)
+        for i in range(args.sessions)
+    ]
+    print(f"{args.sessions} sessions, {args.mode} mode, {args.duration:.0f} s on {db.DB_PATH}")
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    report(results, time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# maintenance.py
+# Background housekeeping for the tracker database: purging expired
+# tombstones, incremental vacuum to give deleted pages back to the file
+# system, compressing long text written before compression existed,
+# and PRAGMA optimize / ANALYZE so the query planner has statistics, plus
+# the SLA scan that flags stale logs, the one-off status history backfill
+# and indexing client names for duplicate detection. Jobs run from one
+# daemon thread, on one connection per workspace file; the last run of
+# each job is kept in that workspace's meta table. On a server database
+# only the portable jobs run: the server does its own vacuuming and
+# statistics.
+# A full VACUUM never runs in the background: it rewrites the whole file
+# and holds the write lock meanwhile. compact() runs it on request (the
+# Settings page or the CLI), to switch a file created before incremental
+# vacuum to it, or to repack pages after compression.
+# Usage: python maintenance.py [run | stats | compact]
+import argparse
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import db
+
+MAINTENANCE = os.environ.get("LOGBOOK_MAINTENANCE", "1") == "1"
+MAINT_TICK = 60  # seconds between scheduler checks
+MAINT_FREE_PAGES = 256  # vacuum once this many pages are free ...
+MAINT_FREE_RATIO = 0.10  # ... or this share of the file is free
+MAINT_VACUUM_STEP = 1000  # pages released per incremental_vacuum call
+MAINT_SLA_INTERVAL = 300  # seconds between SLA scans
+
+log = logging.getLogger(__name__)
+
+
+# ------- Jobs -------
+@dataclass(slots=True)
+class Job:
+    name: str
+    run: callable  # (conn) -> None
+    interval: float = None  # seconds between scheduled runs; None = only when needed
+    needed: callable = None  # (conn) -> bool, runs the job early when true
+    portable: bool = False  # also runs on a server database
+
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name};").fetchone()[0]
+
+
+# Free pages can only be released step by step in incremental mode; a
+# file still in another mode waits for compact()
+def _incremental(conn):
+    return _pragma(conn, "auto_vacuum") == 2
+
+
+def _too_much_free(conn):
+    free = _pragma(conn, "freelist_count")
+    total = _pragma(conn, "page_count")
+    return _incremental(conn) and (free >= MAINT_FREE_PAGES or (total and free / total >= MAINT_FREE_RATIO))
+
+
+def _incremental_vacuum(conn):
+    # Small steps so a writer never waits for the whole release
+    while _incremental(conn) and _pragma(conn, "freelist_count"):
+        conn.execute(f"PRAGMA incremental_vacuum({MAINT_VACUUM_STEP});").fetchall()
+
+
+def _no_stats(conn):
+    return not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1';"
+    ).fetchone()
+
+
+JOBS = [
+    # Before the vacuum, so purged and shrunk pages are released in the same pass
+    Job("purge_deleted", db.purge_deleted, interval=3600),
+    Job("compress_longtext", db.compress_longtext, interval=86400),
+    Job("incremental_vacuum", _incremental_vacuum, interval=86400, needed=_too_much_free),
+    Job("analyze", lambda conn: conn.execute("ANALYZE;"), interval=7 * 86400, needed=_no_stats),
+    Job("optimize", lambda conn: conn.execute("PRAGMA optimize;"), interval=3600),
+    Job("sla_scan", db.sla_scan, interval=MAINT_SLA_INTERVAL, portable=True),
+    Job("backfill_status_history", db.backfill_status_history,
+        needed=lambda conn: not db.history_backfilled(conn), portable=True),
+    Job("index_client_names", db.index_client_names, needed=db.names_pending, portable=True),
+]
+
+
+def _due(job: Job, conn, since, force: bool):
+    if job.needed and job.needed(conn):
+        return True
+    if job.interval is None:
+        return False
+    return force or since is None or since >= job.interval
+
+
+def last_runs(conn=None):
+    rows = (conn or db.get_connection()).execute("SELECT key, value FROM meta WHERE key LIKE 'maint.%';").fetchall()
+    return {k[len("maint."):]: datetime.fromisoformat(v) for k, v in rows}
+
+
+# Run every job that is due; force=True ignores the schedule (but a
+# job with no interval still only runs when needed).
+# Returns [(job name, milliseconds)] for the jobs that ran.
+def run_due(conn, force=False):
+    last = last_runs(conn)
+    now = datetime.now()
+    ran = []
+    for job in JOBS:
+        if not job.portable and db.BACKEND.name != "sqlite":
+            continue
+        since = (now - last[job.name]).total_seconds() if job.name in last else None
+        if not _due(job, conn, since, force):
+            continue
+        t0 = time.perf_counter()
+        try:
+            job.run(conn)
+        except Exception as e:
+            log.warning("Maintenance job %s failed: %s", job.name, e)
+            continue
+        _record(conn, job.name)
+        ran.append((job.name, (time.perf_counter() - t0) * 1000))
+    return ran
+
+
+def _record(conn, name: str):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+        (f"maint.{name}", datetime.now().isoformat(timespec="seconds")),
+    )
+
+
+def _maint_connection(path: str):
+    conn = db._connect(path)
+    conn.isolation_level = None  # VACUUM and incremental_vacuum need autocommit
+    return conn
+
+
+def _run():
+    conns = {}
+    while True:
+        # Workspaces created since the last tick are picked up here
+        for workspace in db.list_workspaces():
+            path = db.workspace_path(workspace)
+            if db.BACKEND.name == "sqlite" and not os.path.exists(path):
+                continue
+            # A failed pass (e.g. the database stayed locked during a
+            # backup) is retried on the next tick, on a fresh connection
+            try:
+                if path not in conns:
+                    conns[path] = _maint_connection(path)
+                for name, ms in run_due(conns[path]):
+                    log.info("Maintenance job %s on %s took %.0f ms", name, workspace, ms)
+            except Exception:
+                log.exception("Maintenance pass on %s failed", workspace)
+                conn = conns.pop(path, None)
+                if conn is not None:
+                    with contextlib.suppress(Exception):
+                        conn.close()
+        time.sleep(MAINT_TICK)
+
+
+def start_maintenance():
+    if MAINTENANCE and "scheduler" not in globals():
+        global scheduler
+        scheduler = threading.Thread(target=_run, name="db-maintenance", daemon=True)
+        scheduler.start()
+
+
+# Runs on the current workspace only
+def run_now():
+    conn = _maint_connection(db.current_path())
+    try:
+        return run_due(conn, force=True)
+    finally:
+        conn.close()
+
+
+# Full VACUUM of the current workspace, in incremental auto_vacuum mode
+# from then on (the mode of an existing file only changes through a
+# VACUUM). Writers wait until it is done; returns milliseconds taken.
+def compact():
+    conn = _maint_connection(db.current_path())
+    try:
+        t0 = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        conn.execute("VACUUM;")
+        _record(conn, "compact")
+        return (time.perf_counter() - t0) * 1000
+    finally:
+        conn.close()
+
+
+# ------- Stats -------
+def storage_stats():
+    conn = db.get_connection()
+    page_size = _pragma(conn, "page_size")
+    page_count = _pragma(conn, "page_count")
+    free = _pragma(conn, "freelist_count")
+    path = db.current_path()
+    wal = path + "-wal"
+    return {
+        "file_bytes": os.path.getsize(path),
+        "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_pages": free,
+        "free_pct": 100 * free / page_count if page_count else 0.0,
+        "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}[_pragma(conn, "auto_vacuum")],
+    }
+
+
+# Share of unused bytes inside in-use pages, or None without the dbstat
+# module (optional at compile time). Reads every page, so it is only
+# measured on request.
+def page_slack():
+    try:
+        used, unused = db.get_connection().execute(
+            "SELECT SUM(pgsize), SUM(unused) FROM dbstat;"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return 100 * unused / used if used else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run database maintenance.")
+    ap.add_argument("cmd", choices=["run", "stats", "compact"])
+    ap.add_argument("--db", default=db.DB_PATH, help="database file of the default workspace")
+    ap.add_argument("--workspace", default=db.DEFAULT_WORKSPACE)
+    args = ap.parse_args()
+    db.DB_PATH = args.db
+    db.set_workspace(args.workspace)
+    if db.BACKEND.name != "sqlite":
+        raise SystemExit(f"maintenance.py is for SQLite; the {db.BACKEND.name} server maintains itself")
+    db.init_db()  # the runs are recorded in the meta table
+
+    if args.cmd == "run":
+        for name, ms in run_now():
+            print(f"{name:<28} {ms:>9.1f} ms")
+    elif args.cmd == "compact":
+        print(f"{'compact':<28} {compact():>9.1f} ms")
+    for k, v in {**storage_stats(), "slack_pct": page_slack()}.items():
+        print(f"{k:<16} {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# models.py
+import zlib
+from dataclasses import dataclass, make_dataclass
+from datetime import date
+from operator import itemgetter
+
+
+# ------- Column registry -------
+# One entry per stored column. Row models, generated SQL (db.py), value
+# coercion and the client form (dialogs.py) are all derived from these.
+@dataclass(frozen=True, slots=True)
+class Column:
+    name: str
+    kind: str = "text"  # text | longtext | int | bool | date
+    label: str = None
+
+
+CLIENT_FIELDS = (
+    Column("name", label="Client Name *"),
+    Column("code", label="Client Code / Short Name"),
+    Column("status", label="Status"),
+    Column("po_date", "date", "PO Received Date"),
+    Column("initial_training_date", "date", "Initial Training Date"),
+    Column("go_live_date", "date", "Go LIVE Date"),
+    Column("fame_version", label="FaME Version"),
+    Column("pocket_fame", "bool", "Pocket FaME Enabled"),
+    Column("state", label="State"),
+    Column("initial_manpower", "int", "Initial Manpower"),
+    Column("num_users", "int", "Number of Users"),
+    Column("num_branches", "int", "Number of Branches"),
+    Column("proforma_integration", "bool", "Proforma Integration"),
+    Column("einvoice_integration", "bool", "E-Invoice Integration"),
+    Column("kyc_aadhaar", "bool", "KYC – Aadhaar"),
+    Column("kyc_bank", "bool", "KYC – Bank Account"),
+    Column("sms_integration", "bool", "SMS Integration"),
+    Column("sendmail_payslips", "bool", "Mail – Pay slips"),
+    Column("sendmail_invoice", "bool", "Mail – Invoice"),
+    Column("bank_integration", "bool", "Bank Integration"),
+    Column("psf", label="PSF (Count / Status / Note)"),
+    Column("contact_name", label="Primary Contact Name"),
+    Column("contact_designation", label="Designation"),
+    Column("contact_phone", label="Phone Number"),
+    Column("contact_email", label="Email ID"),
+    Column("notes", "longtext", "Project Notes / Aspects"),
+)
+
+# Integration flags on clients, in bit order of clients.integration_mask
+INTEGRATION_FLAGS = [
+    ("proforma_integration", "Proforma"),
+    ("einvoice_integration", "E-Invoice"),
+    ("kyc_aadhaar", "KYC – Aadhaar"),
+    ("kyc_bank", "KYC – Bank"),
+    ("sms_integration", "SMS"),
+    ("sendmail_payslips", "Mail – Pay slips"),
+    ("sendmail_invoice", "Mail – Invoice"),
+    ("bank_integration", "Bank Integration"),
+]
+
+LOG_FIELDS = (
+    Column("client_id", "int"),
+    Column("log_date", "date", "Log Date"),
+    Column("title", label="Title *"),
+    Column("description", "longtext", "Description"),
+    Column("status", label="Status"),
+    Column("owner", label="Owner"),
+    Column("remarks", "longtext", "Remarks"),
+)
+
+MODULE_FIELDS = (
+    Column("client_id", "int"),
+    Column("module_id", "int"),
+    Column("customizations", "longtext", "Customizations / Notes"),
+    Column("is_live", "bool", "Module LIVE"),
+)
+
+ID = Column("id", "int")
+VERSION = Column("version", "int")
+PY_TYPES = {"text": str, "longtext": str, "int": int, "bool": bool, "date": date}
+
+# Full column list of each model (editable fields plus read-only ones)
+MODEL_COLUMNS = {}
+
+
+def _model(name: str, columns):
+    model = make_dataclass(
+        name,
+        [(c.name, PY_TYPES[c.kind], False if c.kind == "bool" else None) for c in columns],
+        slots=True,
+    )
+    MODEL_COLUMNS[model] = {c.name: c for c in columns}
+    return model
+
+
+Client = _model("Client", (ID, *CLIENT_FIELDS, Column("integration_mask", "int"), VERSION))
+Log = _model("Log", (ID, *LOG_FIELDS, VERSION))
+Module = _model("Module", (ID, *MODULE_FIELDS, Column("module_name"), VERSION))
+
+
+# ------- Generated converters -------
+def _to_date(v):
+    return v if isinstance(v, date) else date.fromisoformat(v)
+
+
+def _iso(v):
+    return v.isoformat() if isinstance(v, date) else v
+
+
+# Long free text is stored zlib-compressed, as a BLOB, from this many bytes
+# up; shorter text stays plain TEXT. None turns compression off.
+COMPRESS_MIN_BYTES = 512
+
+
+def _pack(v):
+    if COMPRESS_MIN_BYTES is None or not isinstance(v, str):
+        return v
+    raw = v.encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return v
+    packed = zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else v
+
+
+def _unpack(v):
+    return zlib.decompress(v).decode() if isinstance(v, bytes) else v
+
+
+# Python value -> stored value, per column kind
+TO_DB = {
+    "text": lambda v: v,
+    "longtext": _pack,
+    "int": lambda v: v,
+    "bool": lambda v: 1 if v else 0,
+    "date": _iso,
+}
+
+
+def _from_date(v):
+    return _to_date(v) if v else None
+
+
+# Stored value -> Python value, per column kind; None where no conversion
+FROM_DB = {
+    "text": None,
+    "longtext": _unpack,
+    "int": None,
+    "bool": bool,
+    "date": _from_date,
+}
+
+# Row tuple -> model, one per (model, column list); rows are decoded once.
+# itemgetter puts the row in model field order, padded with the defaults
+# of fields the query did not select, and only the columns that need it
+# are converted.
+_LOADERS = {}
+
+
+def _loader(model, names: tuple):
+    fn = _LOADERS.get((model, names))
+    if fn is None:
+        columns = MODEL_COLUMNS[model]
+        at = {n: i for i, n in enumerate(names) if n in columns}
+        pad = tuple(False if c.kind == "bool" else None for n, c in columns.items() if n not in at)
+        picks, missing = [], iter(range(len(names), len(names) + len(pad)))
+        for n in columns:
+            picks.append(at[n] if n in at else next(missing))
+        get = itemgetter(*picks)
+        convs = [(pos, FROM_DB[c.kind]) for pos, (n, c) in enumerate(columns.items())
+                 if n in at and FROM_DB[c.kind]]
+
+        def fn(r):
+            vals = get(r + pad) if pad else get(r)
+            if convs:
+                vals = list(vals)
+                for pos, conv in convs:
+                    vals[pos] = conv(vals[pos])
+            return model(*vals)
+
+        _LOADERS[(model, names)] = fn
+    return fn
+
+
+def load_rows(model, cur):
+    cur.row_factory = None  # plain tuples; the model replaces sqlite3.Row
+    fn = _loader(model, tuple(d[0] for d in cur.description))
+    return list(map(fn, cur.fetchall()))
+
+
+def load_row(model, cur):
+    rows = load_rows(model, cur)
+    return rows[0] if rows else None
+
+
+# Data dict -> INSERT parameter tuple for `columns`. Required columns
+# raise KeyError when missing; the others default to NULL.
+def params_builder(columns, required=()):
+    names = [c.name for c in columns]
+    check = itemgetter(*required) if required else None
+    convs = [(i, TO_DB[c.kind]) for i, c in enumerate(columns) if c.kind not in ("text", "int")]
+
+    def build(d):
+        if check:
+            check(d)
+        vals = [d.get(n) for n in names]
+        for i, conv in convs:
+            vals[i] = conv(vals[i])
+        return tuple(vals)
+
+    return build
@@ -0,0 +1,544 @@
+# storage.py
+# Storage backends behind db.py. The pages and db.py's function API stay
+# the same; a backend opens connections, sets up its own schema and adapts
+# the handful of SQLite-isms in the shared statements. SQLite is the
+# default. Set LOGBOOK_DATABASE_URL=postgresql://user@host/dbname to run on
+# PostgreSQL 14+ instead (needs psycopg: pip install "psycopg[binary]").
+import functools
+import os
+import re
+import sqlite3
+
+from models import INTEGRATION_FLAGS
+
+DATABASE_URL = os.environ.get("LOGBOOK_DATABASE_URL", "")
+
+
+# ------- SQLite -------
+class SQLiteBackend:
+    name = "sqlite"
+    IntegrityError = sqlite3.IntegrityError
+    Row = sqlite3.Row
+
+    def connect(self, path: str):
+        # Generated statements have stable text, so they stay in the statement cache
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=10, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        return conn
+
+    def enable_wal(self, conn):
+        # Readers on other connections must not block the writer
+        conn.execute("PRAGMA journal_mode = WAL;")
+
+    # sqlite3 opens the transaction itself, before the first write
+    def begin(self, conn):
+        pass
+
+    # Lock contention that a later retry can get past
+    def is_busy(self, e):
+        code = getattr(e, "sqlite_errorcode", 0) & 0xFF
+        return isinstance(e, sqlite3.OperationalError) and code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+# ------- PostgreSQL -------
+# Rows behave like sqlite3.Row: by index, by column name, and dict(row)
+class PgRow:
+    __slots__ = ("_names", "_values")
+
+    def __init__(self, names, values):
+        self._names = names
+        self._values = values
+
+    def keys(self):
+        return list(self._names)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._names.index(key)]
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"PgRow({dict(zip(self._names, self._values))})"
+
+
+# Tables whose INSERTs report the new id through cursor.lastrowid
+ID_TABLES = ("clients", "client_logs", "client_modules", "modules")
+_STRING = re.compile(r"('(?:[^']|'')*')")
+_INSERT_INTO = re.compile(r"^\s*INSERT INTO (\w+)", re.I)
+_WRITE = re.compile(r"\s*(INSERT|UPDATE|DELETE)\b", re.I)
+
+
+# SQLite statement -> psycopg statement. SQLite's LIKE is case-insensitive,
+# NOCASE becomes lower() on both sides (the schema indexes lower(...)),
+# LIMIT -1 means "no limit" and INSERT OR IGNORE becomes ON CONFLICT.
+@functools.lru_cache(maxsize=1024)
+def translate(sql: str, has_params: bool):
+    sql = sql.strip().rstrip(";")
+    sql = re.sub(r"\bBEGIN IMMEDIATE\b", "BEGIN", sql)
+    if re.match(r"INSERT OR IGNORE\b", sql, re.I):
+        sql = re.sub(r"^INSERT OR IGNORE", "INSERT", sql, flags=re.I) + " ON CONFLICT DO NOTHING"
+    m = _INSERT_INTO.match(sql)
+    if m and m.group(1) in ID_TABLES and "ON CONFLICT" not in sql.upper():
+        sql += " RETURNING id"
+    parts = _STRING.split(sql)
+    for i, part in enumerate(parts):
+        if has_params:
+            part = part.replace("%", "%%")
+        if i % 2 == 0:  # outside string literals
+            part = re.sub(r"\bLIKE\b", "ILIKE", part)
+            part = re.sub(r"([\w.]+) = \? COLLATE NOCASE", r"lower(\1) = lower(?)", part)
+            part = re.sub(r"([\w.]+) COLLATE NOCASE", r"lower(\1)", part)
+            part = re.sub(r"\bLIMIT \?", "LIMIT NULLIF(?, -1)", part)
+            part = part.replace("?", "%s")
+        parts[i] = part
+    return "".join(parts)
+
+
+class PgCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cur = conn._raw.cursor()
+        self.row_factory = conn.row_factory
+        self.lastrowid = None
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def execute(self, sql: str, params=None):
+        query = translate(sql, params is not None)
+        if _WRITE.match(query):
+            self._conn.begin()
+        self._cur.execute(query, params)
+        self.lastrowid = None
+        if query.endswith(" RETURNING id"):
+            self.lastrowid = self._cur.fetchone()[0]
+        return self
+
+    def executemany(self, sql: str, seq):
+        query = translate(sql, True)
+        if _WRITE.match(query):
+            self._conn.begin()
+        self._cur.executemany(query, seq)
+        self.lastrowid = None
+        return self
+
+    def _wrap(self, row):
+        if row is None or self.row_factory is None:
+            return row
+        return PgRow([d.name for d in self._cur.description], row)
+
+    def fetchone(self):
+        return self._wrap(self._cur.fetchone())
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        if self.row_factory is None:
+            return rows
+        names = [d.name for d in self._cur.description]
+        return [PgRow(names, r) for r in rows]
+
+    def close(self):
+        self._cur.close()
+
+
+# The subset of sqlite3.Connection that db.py and its callers use. The
+# server connection is in autocommit, and transactions are opened the way
+# sqlite3 opens them: before a write, or by begin() inside a mutation.
+# Reads therefore never leave a connection idle in a transaction.
+class PgConnection:
+    def __init__(self, raw):
+        self._raw = raw
+        self._raw.autocommit = True
+        self.isolation_level = "DEFERRED"  # None means autocommit, as in sqlite3
+        self.row_factory = PgRow
+
+    @property
+    def in_transaction(self):
+        from psycopg.pq import TransactionStatus
+
+        return self._raw.info.transaction_status != TransactionStatus.IDLE
+
+    def begin(self):
+        if self.isolation_level is not None and not self.in_transaction:
+            self._raw.execute("BEGIN")
+
+    def cursor(self):
+        return PgCursor(self)
+
+    def execute(self, sql: str, params=None):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+class PostgresBackend:
+    name = "postgres"
+    Row = PgRow
+
+    def __init__(self, url: str):
+        try:
+            import psycopg
+        except ImportError:
+            raise SystemExit('The PostgreSQL backend needs psycopg: pip install "psycopg[binary]"')
+        self.url = url
+        self.psycopg = psycopg
+        self.IntegrityError = psycopg.IntegrityError
+        self.ready = False
+
+    # One shared database: workspaces only exist to split SQLite's single
+    # writer lock, so `path` is not used here
+    def connect(self, path: str):
+        return PgConnection(self.psycopg.connect(self.url))
+
+    def enable_wal(self, conn):
+        pass
+
+    # A mutation's reads run in the same transaction as its writes
+    def begin(self, conn):
+        conn.begin()
+
+    def is_busy(self, e):
+        errors = self.psycopg.errors
+        return isinstance(e, (errors.LockNotAvailable, errors.DeadlockDetected, errors.SerializationFailure))
+
+    # The schema script is idempotent; it runs once per process
+    def init_schema(self, conn):
+        if self.ready:
+            return
+        cur = conn.cursor()
+        cur._cur.execute(PG_SCHEMA)
+        conn.commit()
+        self.ready = True
+
+
+def from_env():
+    if DATABASE_URL.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(DATABASE_URL)
+    if DATABASE_URL:
+        raise SystemExit(f"Unsupported LOGBOOK_DATABASE_URL: {DATABASE_URL}")
+    return SQLiteBackend()
+
+
+# ------- PostgreSQL schema -------
+# Same tables and columns as the SQLite schema in db.py. Dates stay ISO
+# text and flags stay 0/1 integers, so rows load into the same models.
+# The rollups are plain views: the server aggregates over the indexes, so
+# the SQLite counter triggers are not needed.
+_MASK = " | ".join(
+    f"((COALESCE({col}, 0) <> 0)::int << {bit})"
+    for bit, (col, _) in enumerate(INTEGRATION_FLAGS)
+)
+
+PG_SCHEMA = f"""
+-- SQLite date functions used by the shared statements
+CREATE OR REPLACE FUNCTION datetime(t text, modifier text DEFAULT '0 seconds') RETURNS text
+LANGUAGE sql STABLE AS $$
+    SELECT to_char(
+        (CASE WHEN t = 'now' THEN now() AT TIME ZONE 'UTC' ELSE t::timestamp END) + modifier::interval,
+        'YYYY-MM-DD HH24:MI:SS')
+$$;
+CREATE OR REPLACE FUNCTION date(t text, modifier text DEFAULT '0 days') RETURNS text
+LANGUAGE sql STABLE AS $$
+    SELECT to_char(
+        (CASE WHEN t = 'now' THEN now() AT TIME ZONE 'UTC' ELSE NULLIF(t, '')::timestamp END) + modifier::interval,
+        'YYYY-MM-DD')
+$$;
+-- Only the %Y, %m, %d and %W (week of year, Monday first) conversions
+CREATE OR REPLACE FUNCTION strftime(fmt text, t text) RETURNS text
+LANGUAGE sql STABLE AS $$
+    SELECT replace(replace(replace(replace(fmt,
+        '%Y', to_char(d, 'YYYY')),
+        '%m', to_char(d, 'MM')),
+        '%d', to_char(d, 'DD')),
+        '%W', lpad(((extract(doy FROM d)::int + 6 - (extract(isodow FROM d)::int - 1)) / 7)::text, 2, '0'))
+    FROM (SELECT CASE WHEN t = 'now' THEN now() AT TIME ZONE 'UTC' ELSE NULLIF(t, '')::timestamp END AS d) s
+$$;
+-- SUM over comparisons, which SQLite treats as 0/1
+CREATE OR REPLACE FUNCTION julianday(t text) RETURNS double precision
+LANGUAGE sql STABLE AS $$
+    SELECT extract(epoch FROM
+        CASE WHEN t = 'now' THEN now() AT TIME ZONE 'UTC' ELSE NULLIF(t, '')::timestamp END
+    )::double precision / 86400 + 2440587.5
+$$;
+CREATE OR REPLACE FUNCTION bool_sum_step(n bigint, b boolean) RETURNS bigint
+LANGUAGE sql IMMUTABLE STRICT AS $$ SELECT n + b::int $$;
+CREATE OR REPLACE AGGREGATE sum(boolean) (SFUNC = bool_sum_step, STYPE = bigint, INITCOND = '0');
+
+CREATE TABLE IF NOT EXISTS clients (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL,
+    code TEXT,
+    status TEXT,
+    po_date TEXT,
+    initial_training_date TEXT,
+    go_live_date TEXT,
+    fame_version TEXT,
+    pocket_fame INTEGER DEFAULT 0,
+    state TEXT,
+    initial_manpower INTEGER,
+    num_users INTEGER,
+    num_branches INTEGER,
+    proforma_integration INTEGER DEFAULT 0,
+    einvoice_integration INTEGER DEFAULT 0,
+    kyc_aadhaar INTEGER DEFAULT 0,
+    kyc_bank INTEGER DEFAULT 0,
+    sms_integration INTEGER DEFAULT 0,
+    sendmail_payslips INTEGER DEFAULT 0,
+    sendmail_invoice INTEGER DEFAULT 0,
+    bank_integration INTEGER DEFAULT 0,
+    psf TEXT,
+    contact_name TEXT,
+    contact_designation TEXT,
+    contact_phone TEXT,
+    contact_email TEXT,
+    notes TEXT,
+    integration_mask INTEGER GENERATED ALWAYS AS ({_MASK}) STORED,
+    version INTEGER NOT NULL DEFAULT 1,
+    deleted_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS modules (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_modules_name ON modules (lower(name));
+
+CREATE TABLE IF NOT EXISTS client_modules (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    client_id BIGINT NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    module_id BIGINT NOT NULL REFERENCES modules(id),
+    customizations TEXT,
+    is_live INTEGER DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_client_modules_module ON client_modules (module_id, is_live, client_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_client_modules_client ON client_modules (client_id, module_id);
+
+CREATE TABLE IF NOT EXISTS client_logs (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    client_id BIGINT NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    log_date TEXT,
+    title TEXT NOT NULL,
+    description TEXT,
+    status TEXT,
+    owner TEXT,
+    remarks TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    deleted_at TEXT
+);
+
+-- SLA (see db.py): last-change time of each log and the logs in an SLA status
+ALTER TABLE client_logs ADD COLUMN IF NOT EXISTS updated_at TEXT;
+UPDATE client_logs SET updated_at = COALESCE(datetime(NULLIF(log_date, '')), datetime('now'))
+    WHERE updated_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_updated ON client_logs (updated_at, id);
+CREATE OR REPLACE FUNCTION logs_touch() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.updated_at := COALESCE(NEW.updated_at, datetime('now'));
+    ELSIF NEW.version IS DISTINCT FROM OLD.version THEN
+        NEW.updated_at := datetime('now');
+    END IF;
+    RETURN NEW;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_logs_touch BEFORE INSERT OR UPDATE ON client_logs
+    FOR EACH ROW EXECUTE FUNCTION logs_touch();
+CREATE TABLE IF NOT EXISTS log_sla (
+    log_id BIGINT PRIMARY KEY REFERENCES client_logs(id) ON DELETE CASCADE,
+    client_id BIGINT NOT NULL,
+    status TEXT NOT NULL,
+    since TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_sla_status_since ON log_sla (status, since);
+CREATE INDEX IF NOT EXISTS idx_log_sla_client ON log_sla (client_id);
+
+-- Status history (see db.py)
+CREATE TABLE IF NOT EXISTS log_status_history (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    log_id BIGINT NOT NULL REFERENCES client_logs(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_status_history_log ON log_status_history (log_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_status_history_changed ON log_status_history (changed_at);
+CREATE OR REPLACE FUNCTION logs_history() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NOT EXISTS (SELECT 1 FROM log_status_history WHERE log_id = OLD.id) THEN
+        INSERT INTO log_status_history (log_id, status, changed_at)
+        VALUES (OLD.id, COALESCE(OLD.status, ''),
+                COALESCE(OLD.updated_at, datetime(NULLIF(OLD.log_date, '')), datetime('now')));
+    END IF;
+    INSERT INTO log_status_history (log_id, status, changed_at)
+    VALUES (NEW.id, COALESCE(NEW.status, ''), datetime('now'));
+    RETURN NULL;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_logs_history_ins AFTER INSERT ON client_logs
+    FOR EACH ROW EXECUTE FUNCTION logs_history();
+CREATE OR REPLACE TRIGGER trg_logs_history_upd AFTER UPDATE OF status ON client_logs
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status) EXECUTE FUNCTION logs_history();
+
+-- Duplicate detection (see db.py)
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS name_norm TEXT;
+CREATE INDEX IF NOT EXISTS idx_clients_name_norm ON clients (name_norm) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_clients_name_pending ON clients (id) WHERE name_norm IS NULL;
+CREATE OR REPLACE FUNCTION clients_name_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.name IS DISTINCT FROM OLD.name THEN
+        NEW.name_norm := NULL;
+    END IF;
+    RETURN NEW;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_clients_name_changed BEFORE UPDATE OF name ON clients
+    FOR EACH ROW EXECUTE FUNCTION clients_name_changed();
+CREATE TABLE IF NOT EXISTS client_name_grams (
+    gram TEXT NOT NULL,
+    client_id BIGINT NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    PRIMARY KEY (gram, client_id)
+);
+CREATE INDEX IF NOT EXISTS idx_client_name_grams_client ON client_name_grams (client_id);
+CREATE TABLE IF NOT EXISTS client_name_gram_counts (
+    gram TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+);
+CREATE OR REPLACE FUNCTION client_name_grams_count() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO client_name_gram_counts AS g (gram, n) VALUES (NEW.gram, 1)
+        ON CONFLICT (gram) DO UPDATE SET n = g.n + 1;
+    ELSE
+        UPDATE client_name_gram_counts SET n = n - 1 WHERE gram = OLD.gram;
+    END IF;
+    RETURN NULL;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_client_name_grams_count AFTER INSERT OR DELETE ON client_name_grams
+    FOR EACH ROW EXECUTE FUNCTION client_name_grams_count();
+
+CREATE INDEX IF NOT EXISTS idx_clients_tombstones ON clients (deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_client_logs_tombstones ON client_logs (deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_clients_integration_mask ON clients (integration_mask, status)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_clients_live_name ON clients (lower(name)) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_live_date ON client_logs (log_date, id) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_live_title ON client_logs (lower(title) text_pattern_ops)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_client ON client_logs (client_id);
+CREATE INDEX IF NOT EXISTS idx_clients_live_training ON clients (initial_training_date, name, status)
+    WHERE deleted_at IS NULL AND initial_training_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_clients_live_golive ON clients (go_live_date, name, status)
+    WHERE deleted_at IS NULL AND go_live_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_logs_owner_status_date ON client_logs (owner, status, log_date)
+    INCLUDE (client_id) WHERE deleted_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Rollups
+CREATE OR REPLACE VIEW log_rollup_daily AS
+    SELECT COALESCE(date(log_date), '') AS bucket, client_id, COALESCE(status, '') AS status,
+           COUNT(*)::int AS n
+    FROM client_logs WHERE deleted_at IS NULL
+    GROUP BY 1, 2, 3;
+CREATE OR REPLACE VIEW log_rollup_weekly AS
+    SELECT COALESCE(to_char(date_trunc('week', NULLIF(log_date, '')::timestamp), 'YYYY-MM-DD'), '')
+               AS bucket,
+           client_id, COALESCE(status, '') AS status, COUNT(*)::int AS n
+    FROM client_logs WHERE deleted_at IS NULL
+    GROUP BY 1, 2, 3;
+CREATE OR REPLACE VIEW client_golive_monthly AS
+    SELECT COALESCE(strftime('%Y-%m', go_live_date), '') AS bucket, COALESCE(status, '') AS status,
+           COUNT(*)::int AS n
+    FROM clients WHERE deleted_at IS NULL
+    GROUP BY 1, 2;
+
+-- Completions (see db.py): when a log first reached 'In Progress' and
+-- 'Completed' is kept on the log, and the weekly view aggregates it like
+-- the other rollups
+ALTER TABLE client_logs ADD COLUMN IF NOT EXISTS completed_at TEXT;
+ALTER TABLE client_logs ADD COLUMN IF NOT EXISTS started_at TEXT;
+UPDATE client_logs l SET completed_at = COALESCE(
+        (SELECT MIN(changed_at) FROM log_status_history h
+         WHERE h.log_id = l.id AND h.status = 'Completed'),
+        updated_at, datetime(NULLIF(log_date, '')), datetime('now'))
+    WHERE completed_at IS NULL AND (status = 'Completed' OR id IN (
+        SELECT log_id FROM log_status_history WHERE status = 'Completed'));
+UPDATE client_logs l SET started_at = (
+        SELECT MIN(changed_at) FROM log_status_history h
+        WHERE h.log_id = l.id AND h.status = 'In Progress'
+          AND (l.completed_at IS NULL OR h.changed_at <= l.completed_at))
+    WHERE started_at IS NULL AND id IN (
+        SELECT log_id FROM log_status_history WHERE status = 'In Progress');
+CREATE OR REPLACE FUNCTION logs_completed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.status = 'In Progress' AND NEW.started_at IS NULL AND NEW.completed_at IS NULL THEN
+        NEW.started_at := datetime('now');
+    END IF;
+    IF NEW.status = 'Completed' AND NEW.completed_at IS NULL THEN
+        NEW.completed_at := datetime('now');
+    END IF;
+    RETURN NEW;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_logs_completed BEFORE INSERT OR UPDATE OF status ON client_logs
+    FOR EACH ROW EXECUTE FUNCTION logs_completed();
+CREATE OR REPLACE VIEW log_completion_weekly AS
+    SELECT to_char(date_trunc('week', completed_at::timestamp), 'YYYY-MM-DD') AS bucket, client_id,
+           COUNT(*)::int AS completed,
+           COALESCE(SUM(extract(epoch FROM completed_at::timestamp - started_at::timestamp) / 86400)
+                    FILTER (WHERE started_at <= completed_at), 0)::double precision AS total_days,
+           COUNT(*) FILTER (WHERE started_at <= completed_at)::int AS timed
+    FROM client_logs WHERE completed_at IS NOT NULL AND deleted_at IS NULL
+    GROUP BY 1, 2;
+
+-- Revisions (see db.py): one bump per statement is enough for readers
+CREATE TABLE IF NOT EXISTS table_revisions (
+    name TEXT PRIMARY KEY,
+    rev BIGINT NOT NULL
+);
+CREATE OR REPLACE FUNCTION bump_revision() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_revisions AS r (name, rev) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (name) DO UPDATE SET rev = r.rev + 1;
+    RETURN NULL;
+END
+$$;
+CREATE OR REPLACE TRIGGER trg_clients_rev AFTER INSERT OR UPDATE OR DELETE ON clients
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+CREATE OR REPLACE TRIGGER trg_client_logs_rev AFTER INSERT OR UPDATE OR DELETE ON client_logs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+CREATE OR REPLACE TRIGGER trg_client_modules_rev AFTER INSERT OR UPDATE OR DELETE ON client_modules
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_revision();
+"""
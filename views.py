@@ -1,6 +1,12 @@
 # views.py
+import functools
 import streamlit as st
 import pandas as pd
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime, timezone
+from operator import attrgetter
+from types import SimpleNamespace
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from db import (
     get_client_by_id,
     get_logs_for_client,
@@ -8,53 +14,310 @@ from db import (
     create_module,
     delete_module,
     update_module,
+    changed_fields,
+    overdue_logs,
+    table_revisions,
+    SLA_DAYS,
+    DEFAULT_WORKSPACE,
+    set_workspace,
 )
 
 
+# ------- Page chrome -------
+THEME_LINK = '<link rel="stylesheet" href="app/static/theme.css">'
+
+
+def page_header(icon: str, title: str, subtitle: str):
+    st.markdown(
+        f'<div class="notion-page-header"><div class="notion-page-icon">{icon}</div>'
+        f'<div><div class="notion-page-title">{title}</div>'
+        f'<div class="notion-page-subtitle">{subtitle}</div></div></div>',
+        unsafe_allow_html=True,
+    )
+
+
+def section_title(title: str):
+    st.markdown(f'<div class="notion-section-title">{title}</div>', unsafe_allow_html=True)
+
+
+# Logs past their status's SLA (see db.overdue_logs)
+def sla_badge(count: int):
+    if count:
+        st.markdown(
+            f"<div class='nt-pill nt-pill-sla'>⏰ {count} log{'s' if count > 1 else ''} past SLA</div>",
+            unsafe_allow_html=True,
+        )
+
+
+# Whole days a log has been in its status; since is UTC like datetime('now')
+def sla_age(since: str):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return (now - datetime.fromisoformat(since)).days
+
+
+def sla_table(rows):
+    df = to_df(rows)
+    df["days"] = df["since"].map(sla_age)
+    df["limit"] = df["status"].map(SLA_DAYS)
+    cols = ["client_name", "title", "status", "owner", "days", "limit"]
+    st.dataframe(df[cols], use_container_width=True, hide_index=True)
+
+
+# Bytes sent to the browser per rerun. Streamlit has no public hook for
+# this, so the run context's enqueue function is wrapped; if its internals
+# change the meter just stays empty.
+def start_payload_meter():
+    ctx = get_script_run_ctx()
+    st.session_state["_payload_bytes"] = 0
+    if ctx is None or getattr(ctx._enqueue, "_metered", False):
+        return
+    enqueue = ctx._enqueue
+
+    def metered(msg):
+        if "_payload_bytes" in st.session_state:
+            st.session_state["_payload_bytes"] += msg.ByteSize()
+        enqueue(msg)
+
+    metered._metered = True
+    ctx._enqueue = metered
+
+
+def stop_payload_meter(page: str):
+    sent = st.session_state.pop("_payload_bytes", None)
+    if sent:
+        st.session_state.setdefault("payload_bytes", {})[page] = sent
+
+
+# ------- Workspace dialogs -------
+# Dialogs are fragments: their reruns skip main() and can land on a fresh
+# script thread, so they select the session's workspace again themselves.
+def dialog(title: str):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            set_workspace(st.session_state.get("workspace", DEFAULT_WORKSPACE))
+            return fn(*args, **kwargs)
+
+        return st.dialog(title)(body)
+
+    return wrap
+
+
+# ------- Session identity map -------
+# Full rows already loaded in this session, keyed by (table, id) and tagged
+# with the table revision read at the start of the rerun. Lists read narrow
+# projections, so only the rows dialogs load are kept; reopening a dialog
+# or rerunning it reuses them until the table changes.
+def sync_revisions():
+    latest = table_revisions()
+    seen = st.session_state.get("_revisions", {})
+    rows = st.session_state.setdefault("_rows", {})
+    changed = {t for t in set(latest) | set(seen) if latest.get(t) != seen.get(t)}
+    if changed:
+        for key in [k for k in rows if k[0] in changed]:
+            del rows[key]
+    st.session_state["_revisions"] = latest
+
+
+def cached_row(table: str, row_id: int, load):
+    rev = st.session_state.get("_revisions", {}).get(table)
+    cache = st.session_state.setdefault("_rows", {})
+    hit = cache.get((table, row_id))
+    if hit is not None and hit[0] == rev:
+        return hit[1]
+    row = load(row_id)
+    if row is not None:
+        cache[(table, row_id)] = (rev, row)
+    return row
+
+
+# ------- Queued writes -------
+# In async write mode (LOGBOOK_ASYNC_WRITES) a mutation returns before the
+# writer thread commits it. Dialogs hand the future to track_write: until
+# it resolves, created rows are listed as saving and deleted ones hidden,
+# and a write that fails is reported on the next rerun. Callbacks run on
+# the writer thread, so they only flag the entry and append to the
+# failure list captured here, never touch st.session_state itself.
+def track_write(fut, op: str, kind: str, label: str, row: dict = None):
+    failed = st.session_state.setdefault("_failed_writes", [])
+    entry = {"op": op, "kind": kind, "label": label, "row": row, "done": False}
+
+    def done(f):
+        if f.exception() is not None:
+            failed.append((entry, f.exception()))
+        entry["done"] = True
+
+    fut.add_done_callback(done)  # runs at once when already resolved
+    if not entry["done"]:
+        st.session_state.setdefault("_queued_writes", []).append(entry)
+    return fut
+
+
+def _queued(op: str, kind: str):
+    return [
+        e["row"] for e in st.session_state.get("_queued_writes", ())
+        if not e["done"] and e["op"] == op and e["kind"] == kind
+    ]
+
+
+def queued_rows(kind: str):
+    return _queued("create", kind)
+
+
+def queued_deletes(kind: str):
+    return {row["id"] for row in _queued("delete", kind)}
+
+
+# Sidebar: failed writes since the last rerun, then what is still queued
+def write_status():
+    failed = st.session_state.get("_failed_writes", [])
+    while failed:
+        entry, err = failed.pop(0)
+        st.sidebar.error(f"Could not {entry['op']} {entry['kind']} “{entry['label']}”: {err}")
+        undo = st.session_state.get("last_deleted")
+        if entry["op"] == "delete" and undo and undo[:2] == (entry["kind"], entry["row"]["id"]):
+            del st.session_state["last_deleted"]
+    queued = [e for e in st.session_state.get("_queued_writes", ()) if not e["done"]]
+    st.session_state["_queued_writes"] = queued
+    if queued:
+        st.sidebar.caption(f"⏳ Saving {len(queued)} change(s)…")
+
+
+# ------- Window cache -------
+# Range reads (a calendar month, a year of activity) keyed by their window
+# and tagged with the revisions of the tables they read, so paging back
+# and forth between months only queries windows not seen since the last
+# change. The oldest windows are dropped past WINDOW_CACHE entries.
+WINDOW_CACHE = 24
+
+
+def cached_window(name: str, tables, start: str, end: str, load):
+    revs = tuple(st.session_state.get("_revisions", {}).get(t) for t in tables)
+    cache = st.session_state.setdefault("_windows", {})
+    key = (name, start, end)
+    hit = cache.pop(key, None)
+    rows = hit[1] if hit is not None and hit[0] == revs else load(start, end)
+    cache[key] = (revs, rows)  # re-inserted as the newest entry
+    while len(cache) > WINDOW_CACHE:
+        del cache[next(iter(cache))]
+    return rows
+
+
 def to_df(rows):
     if not rows:
         return pd.DataFrame()
+    if is_dataclass(rows[0]):
+        names = [f.name for f in fields(rows[0])]
+        get = attrgetter(*names)
+        return pd.DataFrame.from_records([get(r) for r in rows], columns=names)
     return pd.DataFrame([dict(r) for r in rows])
 
 
+def _plain(v):
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, date):
+        return v.isoformat()
+    return v if v != "" else None
+
+
+def conflict_prompt(key: str, loaded, latest, payload: dict, save):
+    # Shown when a versioned update lost the race. `save(version)` retries
+    # the same payload against the latest version.
+    if latest is None:
+        st.error("This record was deleted by someone else while you were editing.")
+        if st.button("Close", key=f"{key}_close"):
+            st.session_state.pop(key, None)
+            st.rerun()
+        return
+
+    st.warning(
+        "Someone else saved this record while you were editing. "
+        "Review the differences, then apply your edits on top of theirs "
+        "or discard them."
+    )
+    rows = []
+    for f in fields(loaded):
+        if f.name == "version":
+            continue
+        theirs, before = getattr(latest, f.name), getattr(loaded, f.name)
+        mine = payload.get(f.name, before)
+        if _plain(theirs) != _plain(before) or _plain(mine) != _plain(before):
+            rows.append({
+                "Field": f.name,
+                "When you opened": before,
+                "Theirs (saved)": theirs,
+                "Yours": mine,
+            })
+    if rows:
+        st.dataframe(pd.DataFrame(rows).astype(str), use_container_width=True, hide_index=True)
+
+    c1, c2 = st.columns(2)
+    if c1.button("Apply my changes", key=f"{key}_mine", type="primary"):
+        if save(latest.version):
+            st.session_state.pop(key, None)
+            st.success("Saved.")
+            st.rerun()
+        else:
+            st.error("It changed again – review the latest values and retry.")
+    if c2.button("Discard mine", key=f"{key}_theirs"):
+        st.session_state.pop(key, None)
+        st.rerun()
+
+
+def _module_conflict(key: str, client_id: int, mid: int):
+    loaded, mine = st.session_state[key]
+    latest = next((x for x in get_modules_for_client(client_id) if x.id == mid), None)
+
+    def retry(version):
+        if update_module(mid, mine, version).result():
+            st.session_state["editing_module_id"] = None
+            return True
+        return False
+
+    conflict_prompt(key, loaded, latest, mine, retry)
+
+
 def client_detail_view(client_id: int):
-    client = get_client_by_id(client_id)
+    client = cached_row("clients", client_id, get_client_by_id)
     if not client:
         st.info("Client not found.")
         return
 
-    st.markdown(f"### {client['name']}")
+    st.markdown(f"### {client.name}")
     bits = []
-    if client["code"]:
-        bits.append(client["code"])
-    if client["state"]:
-        bits.append(client["state"])
-    if client["status"]:
-        bits.append(f"Status: {client['status']}")
+    if client.code:
+        bits.append(client.code)
+    if client.state:
+        bits.append(client.state)
+    if client.status:
+        bits.append(f"Status: {client.status}")
     if bits:
         st.caption(" · ".join(bits))
+    overdue = overdue_logs(client_id)
+    sla_badge(len(overdue))
 
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Manpower", client["initial_manpower"] or 0)
-    c2.metric("Users", client["num_users"] or 0)
-    c3.metric("Branches", client["num_branches"] or 0)
-    c4.metric("Pocket FaME", "Yes" if client["pocket_fame"] else "No")
+    c1.metric("Manpower", client.initial_manpower or 0)
+    c2.metric("Users", client.num_users or 0)
+    c3.metric("Branches", client.num_branches or 0)
+    c4.metric("Pocket FaME", "Yes" if client.pocket_fame else "No")
 
     c1, c2, c3 = st.columns(3)
-    c1.write(f"PO Date: **{client['po_date'] or '—'}**")
-    c2.write(f"Training: **{client['initial_training_date'] or '—'}**")
-    c3.write(f"Go LIVE: **{client['go_live_date'] or '—'}**")
+    c1.write(f"PO Date: **{client.po_date or '—'}**")
+    c2.write(f"Training: **{client.initial_training_date or '—'}**")
+    c3.write(f"Go LIVE: **{client.go_live_date or '—'}**")
 
-    if client["contact_name"]:
+    if client.contact_name:
         st.write(
-            f"Contact: **{client['contact_name']}**"
-            + (f" ({client['contact_designation']})" if client["contact_designation"] else "")
+            f"Contact: **{client.contact_name}**"
+            + (f" ({client.contact_designation})" if client.contact_designation else "")
         )
         cl = []
-        if client["contact_phone"]:
-            cl.append(f"📞 {client['contact_phone']}")
-        if client["contact_email"]:
-            cl.append(f"✉️ {client['contact_email']}")
+        if client.contact_phone:
+            cl.append(f"📞 {client.contact_phone}")
+        if client.contact_email:
+            cl.append(f"✉️ {client.contact_email}")
         if cl:
             st.caption(" · ".join(cl))
 
@@ -65,22 +328,22 @@ def client_detail_view(client_id: int):
     # Overview
     with tabs[0]:
         st.subheader("Overview")
-        st.write(f"**FaME Version:** {client['fame_version'] or '—'}")
-        st.write(f"**Status:** {client['status'] or '—'}")
-        st.write(f"**State:** {client['state'] or '—'}")
-        if client["psf"]:
-            st.write(f"**PSF:** {client['psf']}")
-        if client["notes"]:
+        st.write(f"**FaME Version:** {client.fame_version or '—'}")
+        st.write(f"**Status:** {client.status or '—'}")
+        st.write(f"**State:** {client.state or '—'}")
+        if client.psf:
+            st.write(f"**PSF:** {client.psf}")
+        if client.notes:
             st.markdown("**Notes / Aspects:**")
-            st.write(client["notes"])
+            st.write(client.notes)
 
     # Project
     with tabs[1]:
         st.subheader("Project Details")
         c1, c2, c3 = st.columns(3)
-        c1.write(f"Initial Manpower: **{client['initial_manpower'] or 0}**")
-        c2.write(f"Number of Users: **{client['num_users'] or 0}**")
-        c3.write(f"Number of Branches: **{client['num_branches'] or 0}**")
+        c1.write(f"Initial Manpower: **{client.initial_manpower or 0}**")
+        c2.write(f"Number of Users: **{client.num_users or 0}**")
+        c3.write(f"Number of Branches: **{client.num_branches or 0}**")
 
         st.markdown("##### Integrations")
         c1, c2 = st.columns(2)
@@ -88,27 +351,29 @@ def client_detail_view(client_id: int):
         def flag(v): return "✅ Yes" if v else "❌ No"
 
         with c1:
-            st.write(f"Proforma: {flag(client['proforma_integration'])}")
-            st.write(f"E-Invoice: {flag(client['einvoice_integration'])}")
-            st.write(f"KYC – Aadhaar: {flag(client['kyc_aadhaar'])}")
-            st.write(f"KYC – Bank: {flag(client['kyc_bank'])}")
+            st.write(f"Proforma: {flag(client.proforma_integration)}")
+            st.write(f"E-Invoice: {flag(client.einvoice_integration)}")
+            st.write(f"KYC – Aadhaar: {flag(client.kyc_aadhaar)}")
+            st.write(f"KYC – Bank: {flag(client.kyc_bank)}")
         with c2:
-            st.write(f"SMS: {flag(client['sms_integration'])}")
-            st.write(f"Mail – Pay slips: {flag(client['sendmail_payslips'])}")
-            st.write(f"Mail – Invoice: {flag(client['sendmail_invoice'])}")
-            st.write(f"Bank Integration: {flag(client['bank_integration'])}")
+            st.write(f"SMS: {flag(client.sms_integration)}")
+            st.write(f"Mail – Pay slips: {flag(client.sendmail_payslips)}")
+            st.write(f"Mail – Invoice: {flag(client.sendmail_invoice)}")
+            st.write(f"Bank Integration: {flag(client.bank_integration)}")
 
     # Contact
     with tabs[2]:
         st.subheader("Contact Details")
-        st.write(f"**Name:** {client['contact_name'] or '—'}")
-        st.write(f"**Designation:** {client['contact_designation'] or '—'}")
-        st.write(f"**Phone:** {client['contact_phone'] or '—'}")
-        st.write(f"**Email:** {client['contact_email'] or '—'}")
+        st.write(f"**Name:** {client.contact_name or '—'}")
+        st.write(f"**Designation:** {client.contact_designation or '—'}")
+        st.write(f"**Phone:** {client.contact_phone or '—'}")
+        st.write(f"**Email:** {client.contact_email or '—'}")
 
     # Logs tab – read-only (no add form)
     with tabs[3]:
-        logs = get_logs_for_client(client_id)
+        deleting = queued_deletes("log")
+        logs = [l for l in get_logs_for_client(client_id) if l.id not in deleting]
+        saving = [r for r in queued_rows("log") if r["client_id"] == client_id]
         st.subheader("Activity & Tasks")
 
         status_map = {
@@ -119,7 +384,7 @@ def client_detail_view(client_id: int):
         }
         counts = {k: 0 for k in status_map}
         for l in logs:
-            s = l["status"] or "Not Started"
+            s = l.status or "Not Started"
             if s in counts:
                 counts[s] += 1
 
@@ -129,25 +394,30 @@ def client_detail_view(client_id: int):
         c3.metric("🔴 Blocked", counts["Blocked"])
         c4.metric("🟢 Completed", counts["Completed"])
 
+        if overdue:
+            with st.expander("Logs past SLA", expanded=False):
+                sla_table(overdue)
+
         st.markdown("---")
         st.markdown("#### Recent Activity")
 
-        if not logs:
+        if not logs and not saving:
             st.info("No logs for this client yet.")
         else:
-            recent = logs[:5]
-            for l in recent:
-                label = status_map.get(l["status"] or "Not Started", l["status"])
+            # Queued logs first, as they are the newest
+            recent = [(SimpleNamespace(**r), "⏳ Saving…") for r in saving]
+            recent += [(l, status_map.get(l.status or "Not Started", l.status)) for l in logs]
+            for l, label in recent[:5]:
                 st.markdown(
                     f"""
                     <div style="padding:0.5rem 0.75rem;border-radius:0.5rem;border:1px solid #eee;margin-bottom:0.35rem;">
-                      <div style="font-size:0.8rem;color:#777;">{l['log_date'] or ''}</div>
-                      <div style="font-weight:600;margin-bottom:0.1rem;">{l['title']}</div>
+                      <div style="font-size:0.8rem;color:#777;">{l.log_date or ''}</div>
+                      <div style="font-weight:600;margin-bottom:0.1rem;">{l.title}</div>
                       <div style="font-size:0.8rem;margin-bottom:0.15rem;">
-                        {label or ''} | {(l['owner'] or '')}
+                        {label or ''} | {(l.owner or '')}
                       </div>
                       <div style="font-size:0.8rem;color:#555;">
-                        {(l['remarks'] or l['description'] or '')[:120]}
+                        {(l.remarks or l.description or '')[:120]}
                       </div>
                     </div>
                     """,
@@ -168,8 +438,9 @@ def client_detail_view(client_id: int):
     # Modules
     with tabs[4]:
         modules = get_modules_for_client(client_id)
+        assigned = {m.module_name.lower(): m.id for m in modules}
         total = len(modules)
-        live = len([m for m in modules if m["is_live"]])
+        live = len([m for m in modules if m.is_live])
         not_live = total - live
 
         st.subheader("Module Wise Customizations")
@@ -195,12 +466,12 @@ def client_detail_view(client_id: int):
             if submitted:
                 if not m_name.strip():
                     st.error("Module name is required.")
+                elif m_name.strip().lower() in assigned:
+                    st.error(f"{m_name.strip()} is already recorded for this client.")
                 else:
-                    create_module(
-                        client_id,
-                        m_name.strip(),
-                        m_custom.strip() or None,
-                        m_live,
+                    track_write(
+                        create_module(client_id, m_name.strip(), m_custom.strip() or None, m_live),
+                        "create", "module", m_name.strip(),
                     )
                     st.success("Module added.")
                     st.rerun()
@@ -219,24 +490,28 @@ def client_detail_view(client_id: int):
             for idx, m in enumerate(modules):
                 col = cols[idx % 2]
                 with col:
-                    is_editing = st.session_state["editing_module_id"] == m["id"]
+                    is_editing = st.session_state["editing_module_id"] == m.id
 
-                    if is_editing:
+                    conflict_key = f"module_conflict_{m.id}"
+                    if is_editing and conflict_key in st.session_state:
+                        _module_conflict(conflict_key, client_id, m.id)
+
+                    elif is_editing:
                         # --- EDIT MODE CARD ---
-                        with st.form(f"edit_module_form_{m['id']}"):
+                        with st.form(f"edit_module_form_{m.id}"):
                             top1, top2 = st.columns([2, 1])
                             with top1:
                                 module_name = st.text_input(
-                                    "Module Name *", value=m["module_name"]
+                                    "Module Name *", value=m.module_name
                                 )
                             with top2:
                                 is_live = st.checkbox(
-                                    "Module LIVE", value=bool(m["is_live"])
+                                    "Module LIVE", value=m.is_live
                                 )
 
                             customizations = st.text_area(
                                 "Customizations / Notes",
-                                value=m["customizations"] or "",
+                                value=m.customizations or "",
                                 height=80,
                             )
 
@@ -248,31 +523,38 @@ def client_detail_view(client_id: int):
                             if save_btn:
                                 if not module_name.strip():
                                     st.error("Module name is required.")
+                                elif assigned.get(module_name.strip().lower(), m.id) != m.id:
+                                    st.error(f"{module_name.strip()} is already recorded for this client.")
                                 else:
                                     data = {
                                         "module_name": module_name.strip(),
                                         "customizations": customizations.strip() or None,
                                         "is_live": is_live,
                                     }
-                                    update_module(m["id"], data)
-                                    st.success("Module updated.")
-                                    st.session_state["editing_module_id"] = None
-                                    st.rerun()
+                                    data = changed_fields(m, data)
+                                    if update_module(m.id, data, m.version).result():
+                                        st.success("Module updated.")
+                                        st.session_state["editing_module_id"] = None
+                                        st.rerun()
+                                    st.session_state[conflict_key] = (m, data)
 
                             if cancel_btn:
                                 st.session_state["editing_module_id"] = None
                                 st.rerun()
 
                             if delete_btn:
-                                delete_module(m["id"])
-                                st.warning(f"Deleted module: {m['module_name']}")
+                                track_write(delete_module(m.id), "delete", "module", m.module_name, {"id": m.id})
+                                st.warning(f"Deleted module: {m.module_name}")
                                 st.session_state["editing_module_id"] = None
                                 st.rerun()
 
+                        if conflict_key in st.session_state:
+                            _module_conflict(conflict_key, client_id, m.id)
+
                     else:
                         # --- VIEW MODE CARD ---
-                        live_label = "LIVE" if m["is_live"] else "Not Live"
-                        live_color = "#16a34a" if m["is_live"] else "#6b7280"
+                        live_label = "LIVE" if m.is_live else "Not Live"
+                        live_color = "#16a34a" if m.is_live else "#6b7280"
 
                         st.markdown(
                             f"""
@@ -284,7 +566,7 @@ def client_detail_view(client_id: int):
                                 background-color: #ffffff;
                             ">
                               <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.35rem;">
-                                <div style="font-weight: 600;">{m['module_name']}</div>
+                                <div style="font-weight: 600;">{m.module_name}</div>
                                 <span style="
                                     font-size: 0.75rem;
                                     padding: 2px 8px;
@@ -297,7 +579,7 @@ def client_detail_view(client_id: int):
                                 </span>
                               </div>
                               <div style="font-size: 0.85rem; color: #4b5563; min-height: 2.5rem;">
-                                {(m['customizations'] or 'No specific notes').replace('\n','<br>')}
+                                {(m.customizations or 'No specific notes').replace('\n','<br>')}
                               </div>
                             </div>
                             """,
@@ -306,13 +588,13 @@ def client_detail_view(client_id: int):
 
                         b1, b2 = st.columns(2)
                         with b1:
-                            if st.button("✏️ Edit", key=f"edit_module_{m['id']}"):
-                                st.session_state["editing_module_id"] = m["id"]
+                            if st.button("✏️ Edit", key=f"edit_module_{m.id}"):
+                                st.session_state["editing_module_id"] = m.id
                                 st.rerun()
                         with b2:
-                            if st.button("Delete", key=f"del_module_{m['id']}"):
-                                delete_module(m["id"])
-                                st.warning(f"Deleted module: {m['module_name']}")
+                            if st.button("Delete", key=f"del_module_{m.id}"):
+                                track_write(delete_module(m.id), "delete", "module", m.module_name, {"id": m.id})
+                                st.warning(f"Deleted module: {m.module_name}")
                                 st.rerun()
 
 